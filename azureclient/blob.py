@@ -17,9 +17,18 @@ sys.path.append(parent)
 
 from typing import Optional
 
+from azure.core.exceptions import AzureError
 from azure.storage.blob import BlobServiceClient, ContainerClient
 
+from azureclient.inventory import BlobInventory
 from azureclient.sa import AZStorageAccount
+from azureclient.streaming import (
+    DEFAULT_BLOCK_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    BlockUploader,
+    StreamSource,
+    iter_blocks,
+)
 from config.azconfig import AZDataPipelineConfig
 
 CONN_STR = AZStorageAccount().conn_string
@@ -32,6 +41,7 @@ class BlobStorageContainer:
         self._storage_client: Optional[BlobServiceClient] = BlobServiceClient.from_connection_string(conn_str=conn_str)
 
         self._container_client: Optional[ContainerClient] = None
+        self._inventory: Optional[BlobInventory] = None
 
     @property
     def conn_string(self):
@@ -53,6 +63,23 @@ class BlobStorageContainer:
             self._container_client.delete_container()
             print(f"The storage container ({self.container_name}) has been deleted.")
 
+    @property
+    def inventory(self):
+        return self._inventory
+
+    def enable_inventory(self, db_path: str = AZDataPipelineConfig.INVENTORY_DB_PATH, refresh: bool = True):
+        container_client = self._storage_client.get_container_client(self.container_name)
+        self._inventory = BlobInventory(container_client, db_path=db_path)
+        if refresh:
+            relisted = self._inventory.refresh()
+            print(f"The blob inventory ({self.container_name}) has been refreshed ({len(relisted)} prefixes listed).")
+        return self._inventory
+
+    def blob_exists(self, blob: str) -> bool:
+        if self._inventory:
+            return self._inventory.exists(blob)
+        return self._storage_client.get_blob_client(container=self.container_name, blob=blob).exists()
+
     def add_directory(self, folder_name: str):
         pass
 
@@ -64,11 +91,51 @@ class BlobStorageContainer:
         blob_client = self._storage_client.get_blob_client(container=self.container_name, blob=blob)
         print("Uploading to Azure Storage as blob: {}".format(blob))
         with open(filepath, "rb") as data:
-            blob_client.upload_blob(data)
+            try:
+                resp = blob_client.upload_blob(data)
+            except AzureError:
+                if self._inventory:
+                    self._inventory.mark_dirty(blob)
+                raise
+
+        if self._inventory:
+            last_modified = resp.get("last_modified")
+            self._inventory.add(
+                blob, os.path.getsize(filepath), resp.get("etag"), last_modified.isoformat() if last_modified else None
+            )
+
+    def upload_stream(
+            self,
+            source: StreamSource,
+            blob: str,
+            block_size: int = DEFAULT_BLOCK_SIZE,
+            max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+            gzip: bool = False,
+    ):
+        # source is an iterator of bytes or a readable binary stream (pipe, socket, response body) of unknown length
+        blob_client = self._storage_client.get_blob_client(container=self.container_name, blob=blob)
+        print("Streaming to Azure Storage as blob: {}".format(blob))
+
+        uploader = BlockUploader(blob_client, max_concurrency=max_concurrency)
+        try:
+            resp = uploader.upload(iter_blocks(source, block_size=block_size, gzip=gzip))
+        except AzureError:
+            if self._inventory:
+                self._inventory.mark_dirty(blob)
+            raise
+
+        if self._inventory:
+            last_modified = resp.get("last_modified")
+            self._inventory.add(
+                blob, uploader.bytes_uploaded, resp.get("etag"), last_modified.isoformat() if last_modified else None
+            )
+        return uploader.bytes_uploaded
 
     def delete_file(self, blob: str):
         blob_client = self._storage_client.get_blob_client(container=self.container_name, blob=blob)
         blob_client.delete_blob()
+        if self._inventory:
+            self._inventory.remove(blob)
 
 
 if __name__ == '__main__':
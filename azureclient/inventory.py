@@ -0,0 +1,245 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from azure.storage.blob import BlobPrefix, ContainerClient
+
+from config.azconfig import AZDataPipelineConfig
+
+ROOT_PREFIX = ""
+
+
+def top_level_prefix(blob: str) -> str:
+    return blob.split("/", 1)[0] + "/" if "/" in blob else ROOT_PREFIX
+
+
+class _WriteJournal:
+    """Index writes made while a refresh is listing, re-applied after the listing replaces its prefixes."""
+
+    def __init__(self):
+        self.blobs: Dict[str, Optional[tuple]] = {}
+        self.dirty_prefixes: Set[str] = set()
+
+
+class BlobInventory:
+    """Local SQLite index of the blobs in one container.
+
+    The index is filled by listing every top-level prefix in parallel, kept current by the container's own
+    upload/delete calls, and answers existence, prefix and size queries without a service call.
+    """
+
+    def __init__(
+            self,
+            container_client: ContainerClient,
+            db_path: str = AZDataPipelineConfig.INVENTORY_DB_PATH,
+            workers: int = AZDataPipelineConfig.INVENTORY_WORKERS,
+            page_size: int = 5000,
+    ):
+        self._container_client = container_client
+        self.db_path = db_path
+        self.workers = workers
+        self.page_size = page_size
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._journals: List[_WriteJournal] = []
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                container TEXT NOT NULL,
+                name TEXT NOT NULL,
+                prefix TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                PRIMARY KEY (container, name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS prefixes (
+                container TEXT NOT NULL,
+                prefix TEXT NOT NULL,
+                listed_at REAL,
+                is_dirty INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (container, prefix)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    @property
+    def container_name(self) -> str:
+        return self._container_client.container_name
+
+    def exists(self, blob: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM blobs WHERE container = ? AND name = ?", (self.container_name, blob)
+            ).fetchone()
+        return row is not None
+
+    def size(self, blob: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM blobs WHERE container = ? AND name = ?", (self.container_name, blob)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_blobs(self, prefix: str = "") -> List[str]:
+        # a range scan on the primary key instead of LIKE, which sqlite cannot serve from the index
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name FROM blobs WHERE container = ? AND name >= ? AND name < ? ORDER BY name",
+                (self.container_name, prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def total_size(self, prefix: str = "") -> Tuple[int, int]:
+        with self._lock:
+            count, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs WHERE container = ? AND name >= ? AND name < ?",
+                (self.container_name, prefix, prefix + "\U0010ffff"),
+            ).fetchone()
+        return count, size
+
+    def add(self, blob: str, size: int, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        with self._lock, self._db:
+            self._add(blob, (size, etag, last_modified))
+            for journal in self._journals:
+                journal.blobs[blob] = (size, etag, last_modified)
+
+    def remove(self, blob: str):
+        with self._lock, self._db:
+            self._remove(blob)
+            for journal in self._journals:
+                journal.blobs[blob] = None
+
+    def mark_dirty(self, blob_or_prefix: str):
+        prefix = top_level_prefix(blob_or_prefix)
+        with self._lock, self._db:
+            self._mark_dirty(prefix)
+            for journal in self._journals:
+                journal.dirty_prefixes.add(prefix)
+
+    def _add(self, blob: str, details: tuple):
+        prefix = top_level_prefix(blob)
+        self._db.execute(
+            "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", (self.container_name, blob, prefix, *details)
+        )
+        if prefix != ROOT_PREFIX:
+            # a prefix the inventory has never listed is recorded as dirty, so that refresh reconciles it,
+            # or drops its blobs if the prefix is gone by then
+            self._db.execute(
+                "INSERT OR IGNORE INTO prefixes (container, prefix, is_dirty) VALUES (?, ?, 1)",
+                (self.container_name, prefix),
+            )
+
+    def _remove(self, blob: str):
+        self._db.execute("DELETE FROM blobs WHERE container = ? AND name = ?", (self.container_name, blob))
+
+    def _mark_dirty(self, prefix: str):
+        self._db.execute(
+            "INSERT INTO prefixes (container, prefix, is_dirty) VALUES (?, ?, 1) "
+            "ON CONFLICT (container, prefix) DO UPDATE SET is_dirty = 1",
+            (self.container_name, prefix),
+        )
+
+    def rebuild(self):
+        self.refresh(max_age=0)
+
+    def refresh(self, max_age: Optional[float] = AZDataPipelineConfig.INVENTORY_MAX_AGE) -> List[str]:
+        """Re-list only the top-level prefixes that are new, marked dirty, or older than `max_age` seconds.
+
+        Root-level blobs and the set of top-level prefixes come from one delimited listing of the container
+        root, so prefixes that appeared or disappeared are always picked up.
+        """
+
+        # writes made while the listing runs may be missing from it, so they are journaled and re-applied below
+        journal = _WriteJournal()
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            return self._refresh(max_age, journal)
+        finally:
+            with self._lock:
+                self._journals.remove(journal)
+
+    def _refresh(self, max_age: Optional[float], journal: _WriteJournal) -> List[str]:
+        root_blobs, prefixes = self._list_root()
+        now = time.time()
+
+        with self._lock:
+            known = dict(
+                self._db.execute(
+                    "SELECT prefix, CASE WHEN is_dirty = 1 THEN NULL ELSE listed_at END FROM prefixes "
+                    "WHERE container = ? AND prefix != ?",
+                    (self.container_name, ROOT_PREFIX),
+                ).fetchall()
+            )
+
+        stale = [
+            prefix
+            for prefix in prefixes
+            if known.get(prefix) is None or (max_age is not None and now - known[prefix] >= max_age)
+        ]
+        removed = [prefix for prefix in known if prefix not in prefixes]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            listings = list(executor.map(self._list_prefix, stale))
+
+        with self._lock, self._db:
+            self._replace_prefix(ROOT_PREFIX, root_blobs, now)
+            for prefix, blobs in zip(stale, listings):
+                self._replace_prefix(prefix, blobs, now)
+            for prefix in removed:
+                self._replace_prefix(prefix, [], now)
+                self._db.execute(
+                    "DELETE FROM prefixes WHERE container = ? AND prefix = ?", (self.container_name, prefix)
+                )
+
+            for blob, details in journal.blobs.items():
+                if details is None:
+                    self._remove(blob)
+                else:
+                    self._add(blob, details)
+            for prefix in journal.dirty_prefixes:
+                self._mark_dirty(prefix)
+
+        return stale
+
+    def _replace_prefix(self, prefix: str, blobs: Iterable[tuple], listed_at: float):
+        self._db.execute("DELETE FROM blobs WHERE container = ? AND prefix = ?", (self.container_name, prefix))
+        self._db.executemany(
+            "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+            ((self.container_name, name, prefix, size, etag, modified) for name, size, etag, modified in blobs),
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO prefixes (container, prefix, listed_at, is_dirty) VALUES (?, ?, ?, 0)",
+            (self.container_name, prefix, listed_at),
+        )
+
+    def _list_root(self) -> Tuple[List[tuple], List[str]]:
+        root_blobs, prefixes = [], []
+        for item in self._container_client.walk_blobs(delimiter="/", results_per_page=self.page_size):
+            if isinstance(item, BlobPrefix):
+                prefixes.append(item.name)
+            else:
+                root_blobs.append(self._to_row(item))
+        return root_blobs, prefixes
+
+    def _list_prefix(self, prefix: str) -> List[tuple]:
+        return [
+            self._to_row(blob)
+            for blob in self._container_client.list_blobs(name_starts_with=prefix, results_per_page=self.page_size)
+        ]
+
+    @staticmethod
+    def _to_row(blob) -> tuple:
+        last_modified = blob.last_modified.isoformat() if blob.last_modified else None
+        return blob.name, blob.size, blob.etag, last_modified
+
+    def close(self):
+        self._db.close()
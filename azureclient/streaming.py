@@ -0,0 +1,114 @@
+import base64
+import queue
+import threading
+import zlib
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
+
+from azure.storage.blob import BlobBlock, BlobClient
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+
+_READ_SIZE = 64 * 1024
+_END = object()
+
+StreamSource = Union[Iterable[bytes], BinaryIO]
+
+
+def _iter_chunks(source: StreamSource) -> Iterator[bytes]:
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(_READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def iter_blocks(source: StreamSource, block_size: int = DEFAULT_BLOCK_SIZE, gzip: bool = False) -> Iterator[bytes]:
+    """Re-chunk a byte stream of unknown length into blocks of exactly `block_size` bytes (the last may be shorter),
+    optionally gzip-compressing it on the way."""
+
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+    buffer = bytearray()
+    for chunk in _iter_chunks(source):
+        buffer += compressor.compress(chunk) if compressor else chunk
+        while len(buffer) >= block_size:
+            yield bytes(buffer[:block_size])
+            del buffer[:block_size]
+
+    if compressor:
+        buffer += compressor.flush()
+    while buffer:
+        yield bytes(buffer[:block_size])
+        del buffer[:block_size]
+
+
+class BlockUploader:
+    """Stages blocks of one block blob from a bounded queue with a fixed number of worker threads.
+
+    `put` blocks while the queue is full, so a fast producer is held back by the upload rate and at most
+    about `block_size * (2 * max_concurrency + 1)` bytes are held in memory at any time.
+    """
+
+    def __init__(self, blob_client: BlobClient, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self._blob_client = blob_client
+        self._queue: queue.Queue = queue.Queue(maxsize=max_concurrency)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"block-upload-{index}", daemon=True)
+            for index in range(max_concurrency)
+        ]
+        self._block_ids: List[str] = []
+        self._error: Optional[BaseException] = None
+        self.bytes_uploaded = 0
+        self._bytes_lock = threading.Lock()
+
+    def upload(self, blocks: Iterable[bytes], **commit_kwargs):
+        for worker in self._workers:
+            worker.start()
+
+        try:
+            for index, block in enumerate(blocks):
+                block_id = base64.b64encode(f"{index:032d}".encode("ascii")).decode("ascii")
+                self._block_ids.append(block_id)
+                self._put((block_id, block))
+        finally:
+            for _ in self._workers:
+                self._put(_END, check_error=False)
+            for worker in self._workers:
+                worker.join()
+
+        if self._error:
+            raise self._error
+
+        return self._blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in self._block_ids],
+                                                   **commit_kwargs)
+
+    def _put(self, item, check_error: bool = True):
+        while True:
+            if check_error and self._error:
+                raise self._error
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if self._error:
+                continue
+
+            block_id, block = item
+            try:
+                self._blob_client.stage_block(block_id=block_id, data=block, length=len(block))
+                with self._bytes_lock:
+                    self.bytes_uploaded += len(block)
+            except BaseException as ex:
+                self._error = ex
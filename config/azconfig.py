@@ -32,6 +32,10 @@ class AZDataPipelineConfig(AzureConfig):
     OPERATION_TIMEOUT = float(az_config["timeout"]["wait"])
     WAIT_ATTEMPTS = int(az_config["timeout"]["attempts"])
 
+    INVENTORY_DB_PATH = az_config["inventory"]["db_path"]
+    INVENTORY_WORKERS = int(az_config["inventory"]["workers"])
+    INVENTORY_MAX_AGE = float(az_config["inventory"]["max_age"])
+
 
 if __name__ == "__main__":
     pass
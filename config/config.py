@@ -17,6 +17,30 @@ class SnowflakeConfig:
     DATABASE = os.getenv("DATABASE")
     SCHEMA = os.getenv("SCHEMA")
 
+    # session keep-alive / reconnect
+    KEEP_ALIVE = os.getenv("KEEP_ALIVE", "TRUE").upper() == "TRUE"
+    HEARTBEAT_FREQUENCY = int(os.getenv("HEARTBEAT_FREQUENCY", 900))
+    RECONNECT_ATTEMPTS = int(os.getenv("RECONNECT_ATTEMPTS", 5))
+    RECONNECT_BACKOFF = float(os.getenv("RECONNECT_BACKOFF", 0.5))
+    RECONNECT_MAX_BACKOFF = float(os.getenv("RECONNECT_MAX_BACKOFF", 8))
+
+    # slow-query log
+    SLOW_QUERY_THRESHOLD = float(os.getenv("SLOW_QUERY_THRESHOLD", 5))
+    SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", os.path.join("logs", "slow_queries.jsonl"))
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 5 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+
+    # reflection cache
+    REFLECTION_CACHE_DIR = os.getenv("REFLECTION_CACHE_DIR", os.path.join(".cache", "reflection"))
+    REFLECTION_CACHE_MAX_AGE = float(os.getenv("REFLECTION_CACHE_MAX_AGE", 300))
+
+    # load manifest
+    LOAD_MANIFEST_PATH = os.getenv("LOAD_MANIFEST_PATH", os.path.join(".cache", "load_manifest.sqlite3"))
+
+    # spilled result cache
+    RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+
     # snowflake artifacts
     SNOWFLAKE_RESOURCE_TYPES = ['DATABASES', 'WAREHOUSES', 'ROLES', 'SCHEMAS']
     SNOWFLAKE_TABLE_TYPES = ['TEMPORARY', 'TRANSIENT']
@@ -0,0 +1,248 @@
+import csv
+import heapq
+import itertools
+from typing import Iterable, List, Optional, Sequence
+
+from db.snowflake.connector.pyconn import SnowflakeClient
+
+WAREHOUSE_SIZES = ["XSMALL", "SMALL", "MEDIUM", "LARGE", "XLARGE", "XXLARGE", "XXXLARGE", "X4LARGE"]
+CREDITS_PER_HOUR = {size: 2 ** index for index, size in enumerate(WAREHOUSE_SIZES)}
+
+# QUERY_HISTORY reports sizes as display names
+_SIZE_NAMES = {
+    "X-SMALL": "XSMALL", "SMALL": "SMALL", "MEDIUM": "MEDIUM", "LARGE": "LARGE", "X-LARGE": "XLARGE",
+    "2X-LARGE": "XXLARGE", "3X-LARGE": "XXXLARGE", "4X-LARGE": "X4LARGE",
+}
+
+MIN_BILLED_SECONDS = 60
+RESUME_SECONDS = 1.0
+SCALE_IN_IDLE_SECONDS = 120
+ECONOMY_QUEUE_SECONDS = 360
+
+
+def normalize_size(size: str) -> str:
+    size = size.upper().replace(" ", "")
+    return _SIZE_NAMES.get(size, size)
+
+
+class QueryTrace:
+    """Observed queries of one warehouse: arrival time (epoch seconds), execution seconds and the size they ran on."""
+
+    FIELDS = ["start", "execution_seconds", "size"]
+
+    def __init__(self, queries: Iterable[Sequence]):
+        self.queries = sorted((float(start), float(seconds), normalize_size(size)) for start, seconds, size in queries)
+
+    @classmethod
+    def from_history(cls, sfc: SnowflakeClient, wh_name: str, days: int = 7) -> "QueryTrace":
+        sql_query = (
+            "SELECT DATE_PART(EPOCH_MILLISECOND, START_TIME) / 1000, EXECUTION_TIME / 1000, WAREHOUSE_SIZE "
+            "FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY "
+            "WHERE WAREHOUSE_NAME = ? AND WAREHOUSE_SIZE IS NOT NULL AND EXECUTION_TIME > 0 "
+            "AND START_TIME >= DATEADD(DAYS, ?, CURRENT_TIMESTAMP()) ORDER BY START_TIME;"
+        )
+        return cls(sfc.execute_query(sql_query, (wh_name.upper(), -days)))
+
+    @classmethod
+    def from_csv(cls, filepath: str) -> "QueryTrace":
+        with open(filepath, "r", newline="") as trace_file:
+            return cls((row["start"], row["execution_seconds"], row["size"]) for row in csv.DictReader(trace_file))
+
+    def to_csv(self, filepath: str):
+        with open(filepath, "w", newline="") as trace_file:
+            writer = csv.writer(trace_file)
+            writer.writerow(self.FIELDS)
+            writer.writerows(self.queries)
+
+    @property
+    def observed_size(self) -> str:
+        sizes = [size for _, _, size in self.queries]
+        return max(set(sizes), key=sizes.count)
+
+
+def warehouse_load(sfc: SnowflakeClient, wh_name: str, days: int = 7) -> dict:
+    """Average running/queued load as reported by WAREHOUSE_LOAD_HISTORY, for comparison with the simulation."""
+
+    sql_query = (
+        "SELECT AVG(AVG_RUNNING), AVG(AVG_QUEUED_LOAD), AVG(AVG_QUEUED_PROVISIONING) "
+        "FROM TABLE(INFORMATION_SCHEMA.WAREHOUSE_LOAD_HISTORY("
+        "DATE_RANGE_START => DATEADD(DAYS, ?, CURRENT_TIMESTAMP()), WAREHOUSE_NAME => ?));"
+    )
+    avg_running, avg_queued_load, avg_queued_provisioning = sfc.execute_query(sql_query, (-days, wh_name.upper()))[0]
+    return {
+        "avg_running": avg_running,
+        "avg_queued_load": avg_queued_load,
+        "avg_queued_provisioning": avg_queued_provisioning,
+    }
+
+
+class _Cluster:
+    def __init__(self, slots: int, resumed_at: float):
+        self.slots = [resumed_at] * slots
+        self.resumed_at = resumed_at
+        self.is_running = True
+
+    @property
+    def busy_until(self) -> float:
+        return max(self.slots)
+
+
+class WarehouseAdvisor:
+    """Replays a query trace against alternative warehouse settings and recommends the cheapest one that keeps
+    the p95 queue time within `max_p95_queue_seconds`.
+
+    The model is deliberately simple: execution time scales with warehouse size by `scaling_exponent`
+    (1.0 = perfectly linear), every cluster runs `concurrency` queries at once, a suspended warehouse resumes
+    on the next query, and each resume is billed for at least a minute.
+    """
+
+    def __init__(
+            self,
+            trace: QueryTrace,
+            concurrency: int = 8,
+            scaling_exponent: float = 0.7,
+            max_p95_queue_seconds: float = 5.0,
+    ):
+        self.trace = trace
+        self.concurrency = concurrency
+        self.scaling_exponent = scaling_exponent
+        self.max_p95_queue_seconds = max_p95_queue_seconds
+
+    def simulate(
+            self,
+            size: str,
+            auto_suspend: int = 300,
+            min_cluster_count: int = 1,
+            max_cluster_count: int = 1,
+            scaling_policy: str = "STANDARD",
+    ) -> dict:
+        size = normalize_size(size)
+        suspend_after = auto_suspend if auto_suspend else float("inf")
+        clusters: List[_Cluster] = []
+        billed_seconds = 0.0
+        queue_times, elapsed_times = [], []
+
+        def stop(cluster: _Cluster, idle_seconds: float):
+            nonlocal billed_seconds
+            stopped_at = cluster.busy_until + idle_seconds
+            billed_seconds += max(stopped_at - cluster.resumed_at, MIN_BILLED_SECONDS)
+            cluster.is_running = False
+
+        for start, observed_seconds, observed_size in self.trace.queries:
+            speed_up = CREDITS_PER_HOUR[size] / CREDITS_PER_HOUR[observed_size]
+            seconds = observed_seconds / speed_up ** self.scaling_exponent
+
+            running = [cluster for cluster in clusters if cluster.is_running]
+            for index, cluster in enumerate(running):
+                idle_seconds = suspend_after if index < min_cluster_count else min(suspend_after, SCALE_IN_IDLE_SECONDS)
+                if start - cluster.busy_until >= idle_seconds:
+                    stop(cluster, idle_seconds)
+            running = [cluster for cluster in clusters if cluster.is_running]
+
+            if not running:
+                # a suspended warehouse resumes with its minimum number of clusters
+                clusters = [_Cluster(self.concurrency, start + RESUME_SECONDS) for _ in range(min_cluster_count)]
+                running = clusters
+
+            cluster, slot = min(
+                ((cluster, slot) for cluster in running for slot in range(self.concurrency)),
+                key=lambda item: item[0].slots[item[1]],
+            )
+            begins_at = max(start, cluster.slots[slot])
+            wait = begins_at - start
+
+            may_scale_out = len(running) < max_cluster_count and (
+                scaling_policy.upper() == "STANDARD" or wait >= ECONOMY_QUEUE_SECONDS
+            )
+            if wait > RESUME_SECONDS and may_scale_out:
+                cluster = _Cluster(self.concurrency, start + RESUME_SECONDS)
+                clusters.append(cluster)
+                slot = 0
+                begins_at = start + RESUME_SECONDS
+                wait = RESUME_SECONDS
+
+            cluster.slots[slot] = begins_at + seconds
+            queue_times.append(wait)
+            elapsed_times.append(wait + seconds)
+
+        for cluster in clusters:
+            if cluster.is_running:
+                stop(cluster, 0 if suspend_after == float("inf") else suspend_after)
+
+        return {
+            "size": size,
+            "auto_suspend": auto_suspend,
+            "min_cluster_count": min_cluster_count,
+            "max_cluster_count": max_cluster_count,
+            "scaling_policy": scaling_policy.upper(),
+            "credits": round(billed_seconds / 3600 * CREDITS_PER_HOUR[size], 3),
+            "mean_queue_seconds": round(sum(queue_times) / len(queue_times), 3) if queue_times else 0.0,
+            "p95_queue_seconds": round(_percentile(queue_times, 95), 3),
+            "p95_elapsed_seconds": round(_percentile(elapsed_times, 95), 3),
+        }
+
+    def candidates(
+            self,
+            sizes: Optional[List[str]] = None,
+            auto_suspends: Sequence[int] = (60, 120, 300, 600),
+            max_cluster_counts: Sequence[int] = (1, 2, 3),
+            scaling_policies: Sequence[str] = ("STANDARD", "ECONOMY"),
+    ) -> List[dict]:
+        if not sizes:
+            observed = WAREHOUSE_SIZES.index(self.trace.observed_size)
+            sizes = WAREHOUSE_SIZES[max(observed - 2, 0):observed + 3]
+
+        results = []
+        for size, auto_suspend, max_clusters, policy in itertools.product(
+                sizes, auto_suspends, max_cluster_counts, scaling_policies
+        ):
+            if max_clusters == 1 and policy != scaling_policies[0]:
+                continue
+            results.append(self.simulate(size, auto_suspend, 1, max_clusters, policy))
+        return results
+
+    def recommend(self, top: int = 5, **candidate_kwargs) -> List[dict]:
+        results = self.candidates(**candidate_kwargs)
+        within_slo = [result for result in results if result["p95_queue_seconds"] <= self.max_p95_queue_seconds]
+        # ties go to the simpler setup: fewer clusters, then the standard scaling policy
+        if within_slo:
+            return heapq.nsmallest(top, within_slo, key=lambda result: (
+                result["credits"], result["p95_queue_seconds"], result["max_cluster_count"], result["scaling_policy"]
+                != "STANDARD"))
+        return heapq.nsmallest(top, results, key=lambda result: (
+            result["p95_queue_seconds"], result["credits"], result["max_cluster_count"]))
+
+    @staticmethod
+    def apply(sfc: SnowflakeClient, wh_name: str, recommendation: dict):
+        sfc.alter_warehouse(
+            wh_name,
+            size=recommendation["size"],
+            scaling_policy=recommendation["scaling_policy"],
+            auto_suspend=recommendation["auto_suspend"],
+            min_cluster_count=recommendation["min_cluster_count"],
+            max_cluster_count=recommendation["max_cluster_count"],
+        )
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+if __name__ == "__main__":
+    is_to_test_run = True
+    is_to_apply = False
+    if is_to_test_run:
+        sfc = SnowflakeClient()
+        sfc.open_connection()
+        trace = QueryTrace.from_history(sfc, "COMPUTE_WH")
+        recommendations = WarehouseAdvisor(trace).recommend()
+        for recommendation in recommendations:
+            print(recommendation)
+        if is_to_apply and recommendations:
+            WarehouseAdvisor.apply(sfc, "COMPUTE_WH", recommendations[0])
+        sfc.close_connection()
+    else:
+        pass
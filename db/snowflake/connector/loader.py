@@ -0,0 +1,199 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from config.config import SnowflakeConfig
+from db.snowflake.connector.pyconn import SnowflakeClient
+
+# COPY accepts at most 1000 names in a FILES list
+MAX_FILES_PER_COPY = 1000
+
+
+def file_checksum(filepath: str) -> str:
+    md5 = hashlib.md5()
+    with open(filepath, "rb") as data:
+        for chunk in iter(lambda: data.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def table_key(table: str) -> str:
+    # manifest rows are keyed by the qualified DATABASE.SCHEMA.TABLE, so equal table names in other
+    # databases or schemas do not share them
+    return ".".join(part.strip('"').upper() for part in table.split("."))
+
+
+class LoadManifest:
+    """Local record of the files already loaded into each (qualified) table, with their checksums."""
+
+    def __init__(self, db_path: str = SnowflakeConfig.LOAD_MANIFEST_PATH):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS loaded_files ("
+            "table_name TEXT NOT NULL, file_name TEXT NOT NULL, checksum TEXT, rows_loaded INTEGER, "
+            "loaded_at REAL NOT NULL, PRIMARY KEY (table_name, file_name))"
+        )
+
+    def loaded(self, table: str) -> Dict[str, Optional[str]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT file_name, checksum FROM loaded_files WHERE table_name = ?", (table_key(table),)
+            ).fetchall()
+        return dict(rows)
+
+    def is_loaded(self, table: str, file_name: str, checksum: Optional[str] = None) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT checksum FROM loaded_files WHERE table_name = ? AND file_name = ?",
+                (table_key(table), file_name),
+            ).fetchone()
+        if not row:
+            return False
+        if checksum is None:
+            return True
+        # a file re-exported under the same name with different content has to be loaded again; a row without
+        # a checksum (e.g. added by reconcile) cannot vouch for the content, so the file goes to COPY, whose own
+        # load metadata skips it if Snowflake has already loaded exactly this file
+        return row[0] == checksum
+
+    def record(self, table: str, file_name: str, checksum: Optional[str] = None, rows_loaded: int = 0):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO loaded_files VALUES (?, ?, ?, ?, ?)",
+                (table_key(table), file_name, checksum, rows_loaded, time.time()),
+            )
+
+    def reconcile(self, sfc: SnowflakeClient, table: str, days: int = 14) -> int:
+        """Add files that Snowflake reports as loaded (e.g. by another worker) but the manifest does not know."""
+
+        sql_query = (
+            "SELECT FILE_NAME, ROW_COUNT FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY("
+            "TABLE_NAME => ?, START_TIME => DATEADD(DAYS, ?, CURRENT_TIMESTAMP()))) "
+            "WHERE STATUS = 'Loaded';"
+        )
+        known = self.loaded(table)
+        added = 0
+        for file_name, row_count in sfc.execute_query(sql_query, (table, -days)):
+            file_name = os.path.basename(file_name)
+            if file_name not in known:
+                self.record(table, file_name, rows_loaded=row_count)
+                added += 1
+        return added
+
+
+class LoadJob:
+    def __init__(self, tbl_name: str, stage_name: str, ff_name: str, filepaths: Optional[List[str]] = None,
+                 staged_files: Optional[List[str]] = None):
+        # filepaths are local files to PUT first; staged_files are names already present in the stage
+        self.tbl_name = tbl_name.upper()
+        self.stage_name = stage_name
+        self.ff_name = ff_name
+        self.filepaths = filepaths or []
+        self.staged_files = staged_files or []
+
+
+class ClientPool:
+    """A fixed set of connected SnowflakeClients handed out one per thread."""
+
+    def __init__(self, client_factory: Callable[[], SnowflakeClient], size: int):
+        self._clients: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._clients.put(client_factory())
+
+    @contextmanager
+    def client(self):
+        sfc = self._clients.get()
+        try:
+            yield sfc
+        finally:
+            self._clients.put(sfc)
+
+    def close(self):
+        while not self._clients.empty():
+            self._clients.get().close_connection()
+
+
+class LoadCoordinator:
+    """Runs COPY jobs for independent tables concurrently, loading only files the manifest has not seen.
+
+    Every COPY names its files explicitly, so Snowflake does not have to list the stage to find them.
+    Jobs that target the same table are run one after the other on the same connection.
+    """
+
+    def __init__(self, client_factory: Callable[[], SnowflakeClient], manifest: Optional[LoadManifest] = None,
+                 max_workers: int = 4, reconcile: bool = True):
+        self.manifest = manifest or LoadManifest()
+        self.max_workers = max_workers
+        self.reconcile = reconcile
+        self._client_factory = client_factory
+
+    def run(self, jobs: List[LoadJob]) -> Dict[str, dict]:
+        jobs_by_table: Dict[str, List[LoadJob]] = {}
+        for job in jobs:
+            jobs_by_table.setdefault(job.tbl_name, []).append(job)
+
+        pool = ClientPool(self._client_factory, min(self.max_workers, len(jobs_by_table)))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    tbl_name: executor.submit(self._run_table, pool, table_jobs)
+                    for tbl_name, table_jobs in jobs_by_table.items()
+                }
+                return {tbl_name: future.result() for tbl_name, future in futures.items()}
+        finally:
+            pool.close()
+
+    def _run_table(self, pool: ClientPool, jobs: List[LoadJob]) -> dict:
+        result = {"files_loaded": 0, "files_skipped": 0, "rows_loaded": 0}
+        with pool.client() as sfc:
+            table = self._qualified_table(sfc, jobs[0].tbl_name)
+            if self.reconcile:
+                self.manifest.reconcile(sfc, table)
+
+            for job in jobs:
+                checksums = {}
+                pending = []
+                for filepath in job.filepaths:
+                    checksum = file_checksum(filepath)
+                    if self.manifest.is_loaded(table, os.path.basename(filepath), checksum):
+                        result["files_skipped"] += 1
+                    else:
+                        pending.append(filepath)
+                        checksums[os.path.basename(filepath)] = checksum
+
+                files = sfc.put_files(pending, job.stage_name, auto_compress=False, overwrite=True) if pending else []
+                for file_name in job.staged_files:
+                    if self.manifest.is_loaded(table, file_name):
+                        result["files_skipped"] += 1
+                    else:
+                        files.append(file_name)
+
+                for index in range(0, len(files), MAX_FILES_PER_COPY):
+                    resp = sfc.copy_into_table(job.tbl_name, job.stage_name, job.ff_name,
+                                               files=files[index:index + MAX_FILES_PER_COPY])
+                    for row in resp:
+                        # "Copy executed with 0 files processed." comes back as a single-column row
+                        if len(row) < 4 or row[1] not in ("LOADED", "PARTIALLY_LOADED"):
+                            continue
+                        file_name = os.path.basename(row[0])
+                        self.manifest.record(table, file_name, checksums.get(file_name), row[3])
+                        result["files_loaded"] += 1
+                        result["rows_loaded"] += row[3]
+
+        print(f"Load of table ({jobs[0].tbl_name}) finished: {result}")
+        return result
+
+    @staticmethod
+    def _qualified_table(sfc: SnowflakeClient, tbl_name: str) -> str:
+        if sfc.current_database and sfc.current_schema_name:
+            return f"{sfc.current_database}.{sfc.current_schema_name}.{tbl_name}"
+        return tbl_name
@@ -0,0 +1,157 @@
+import os
+from typing import Iterable, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+PARQUET_COMPRESSIONS = ["SNAPPY", "ZSTD"]
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+DEFAULT_ROWS_PER_FILE = 4 * 1024 * 1024
+
+
+class ParquetFileWriter:
+    """Writes record batches into one or more Parquet files, starting a new file every `rows_per_file` rows.
+
+    Files are named `<prefix>_0000.parquet`, `<prefix>_0001.parquet`, ... so that a staged load can be split
+    across several COPY threads.
+    """
+
+    def __init__(
+            self,
+            prefix: str,
+            schema: pa.Schema,
+            compression: str = "SNAPPY",
+            row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+            rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+    ):
+        if compression.upper() not in PARQUET_COMPRESSIONS:
+            raise ValueError(f"InvalidCompression: expected one of: {PARQUET_COMPRESSIONS}")
+
+        self.prefix = prefix
+        self.schema = schema
+        self.compression = compression.lower()
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.filepaths: List[str] = []
+
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._rows_in_file = 0
+        self._pending: List[pa.RecordBatch] = []
+        self._pending_rows = 0
+
+    def write_batch(self, batch: pa.RecordBatch):
+        # every write_table call ends a row group, so small input batches are buffered up to a full row group
+        if batch.num_rows:
+            self._pending.append(batch)
+            self._pending_rows += batch.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> List[str]:
+        self._flush(is_final=True)
+        self._close_file()
+        return self.filepaths
+
+    def _flush(self, is_final: bool = False):
+        if not self._pending:
+            return
+        table = pa.Table.from_batches(self._pending, schema=self.schema)
+        self._pending, self._pending_rows = [], 0
+
+        offset = 0
+        while table.num_rows - offset >= self.row_group_size or (is_final and offset < table.num_rows):
+            if not self._writer:
+                self._open_next_file()
+
+            length = min(table.num_rows - offset, self.row_group_size, self.rows_per_file - self._rows_in_file)
+            self._writer.write_table(table.slice(offset, length), row_group_size=self.row_group_size)
+            self._rows_in_file += length
+            offset += length
+
+            if self._rows_in_file >= self.rows_per_file:
+                self._close_file()
+
+        if offset < table.num_rows:
+            self._pending = table.slice(offset).to_batches()
+            self._pending_rows = table.num_rows - offset
+
+    def _open_next_file(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.prefix)), exist_ok=True)
+        filepath = f"{self.prefix}_{len(self.filepaths):04d}.parquet"
+        self._writer = pq.ParquetWriter(filepath, self.schema, compression=self.compression)
+        self._rows_in_file = 0
+        self.filepaths.append(filepath)
+
+    def _close_file(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def rows_to_parquet(
+        rows: Iterable[Sequence],
+        prefix: str,
+        schema: pa.Schema,
+        compression: str = "SNAPPY",
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+) -> List[str]:
+    """Convert an iterable of row tuples into typed Parquet files, holding at most one row group in memory."""
+
+    with ParquetFileWriter(prefix, schema, compression, row_group_size, rows_per_file) as writer:
+        columns = [[] for _ in schema.names]
+        row_count = 0
+        for row in rows:
+            for column, value in zip(columns, row):
+                column.append(value)
+            row_count += 1
+
+            if row_count == row_group_size:
+                writer.write_batch(pa.RecordBatch.from_pydict(dict(zip(schema.names, columns)), schema=schema))
+                columns = [[] for _ in schema.names]
+                row_count = 0
+
+        if row_count:
+            writer.write_batch(pa.RecordBatch.from_pydict(dict(zip(schema.names, columns)), schema=schema))
+
+        return writer.close()
+
+
+def csv_to_parquet(
+        csv_filepath: str,
+        prefix: Optional[str] = None,
+        compression: str = "SNAPPY",
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        rows_per_file: int = DEFAULT_ROWS_PER_FILE,
+        delimiter: str = ",",
+        column_types: Optional[dict] = None,
+) -> List[str]:
+    """Stream a CSV file with a header row into typed Parquet files; column types are inferred by Arrow
+    from the first block unless given in `column_types`."""
+
+    if not prefix:
+        prefix = os.path.splitext(csv_filepath)[0]
+
+    reader = pa_csv.open_csv(
+        csv_filepath,
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    with ParquetFileWriter(prefix, reader.schema, compression, row_group_size, rows_per_file) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+        return writer.close()
+
+
+if __name__ == "__main__":
+    data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "..", "data")
+    print(csv_to_parquet(os.path.join(data_dir, "cars.csv"), compression="ZSTD"))
@@ -1,8 +1,18 @@
-from typing import Optional, Union
+import gzip
+import itertools
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Iterable, List, Optional, Sequence, Union
 
 import snowflake.connector as sfconn
 
 from config.config import SnowflakeConfig
+from db.snowflake.connector.slowlog import SlowQueryLog
+from db.snowflake.connector.spill import ResultCache, SpilledResult
+from db.snowflake.connector.sqlbuilder import Escaped, Keyword, build, ident, literal, qualified
 
 
 class SnowflakeClient:
@@ -19,6 +29,17 @@ class SnowflakeClient:
         self._schema: Optional[str] = None
         self._role: Optional[str] = None
 
+        self._conn_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_error: Optional[sfconn.errors.Error] = None
+
+        self._started_at: float = time.perf_counter()
+        self._login_elapsed: Optional[float] = None
+        self._is_first_query_reported: bool = False
+
+        self._slow_query_log: Optional[SlowQueryLog] = None
+        self._result_cache: Optional[ResultCache] = None
+
     def open_connection(
             self,
             user=SnowflakeConfig.USERNAME,
@@ -27,6 +48,7 @@ class SnowflakeClient:
             warehouse: Union[str, None] = None,
             database: Union[str, None] = None,
             schema: Union[str, None] = None,
+            warm_up: bool = False,
     ):
         self._user = user
         self._password = password
@@ -34,13 +56,50 @@ class SnowflakeClient:
         self._warehouse = warehouse.upper() if warehouse else None
         self._database = database.upper() if warehouse else None
         self._schema = schema.upper() if warehouse else None
+        if warm_up:
+            self._start_warm_up()
+            return None
         return self._create_conn() if warehouse else None
 
+    def _start_warm_up(self):
+        # log in on a background thread so the handshake overlaps with the caller's own start-up work
+        if self._warmup_thread and self._warmup_thread.is_alive():
+            return
+        self._warmup_error = None
+        self._warmup_thread = threading.Thread(target=self._warm_up_conn, name="snowflake-warm-up", daemon=True)
+        self._warmup_thread.start()
+
+    def _warm_up_conn(self):
+        try:
+            self._create_conn()
+        except sfconn.errors.Error as ex:
+            self._warmup_error = ex
+
+    def _wait_for_warm_up(self):
+        if self._warmup_thread and self._warmup_thread is not threading.current_thread():
+            self._warmup_thread.join()
+            self._warmup_thread = None
+            if self._warmup_error:
+                warmup_error, self._warmup_error = self._warmup_error, None
+                raise warmup_error
+
+    def enable_slow_query_log(self, slow_query_log: Optional[SlowQueryLog] = None):
+        self._slow_query_log = slow_query_log or SlowQueryLog()
+        return self._slow_query_log
+
+    def disable_slow_query_log(self):
+        self._slow_query_log = None
+
+    def enable_result_cache(self, result_cache: Optional[ResultCache] = None):
+        self._result_cache = result_cache or ResultCache()
+        return self._result_cache
+
     @property
     def cursor(self):
         if not self._cs or self._cs.is_closed():
-            if not self._conn:
+            if not self._conn or self._conn.is_closed():
                 self._create_conn()
+            self._ensure_context()
             self._cs = self._conn.cursor()
 
         return self._cs
@@ -58,6 +117,7 @@ class SnowflakeClient:
             self.cursor.close()
 
     def close_connection(self):
+        self._wait_for_warm_up()
         if self._conn and not self._conn.is_closed():
             self._conn.close()
 
@@ -74,16 +134,19 @@ class SnowflakeClient:
             max_cluster_count: int = 1,
     ):
 
-        sql_query = (
-            f"CREATE WAREHOUSE IF NOT EXISTS {wh_name} "
-            f"WITH WAREHOUSE_SIZE = {size} "
-            f"WAREHOUSE_TYPE = {wh_type} "
-            f"AUTO_SUSPEND = {auto_suspend} "
-            f"AUTO_RESUME = {'TRUE' if auto_resume else 'FALSE'} "
-            f"MIN_CLUSTER_COUNT = {min_cluster_count} "
-            f"MAX_CLUSTER_COUNT = {max_cluster_count} "
-            f"SCALING_POLICY = {scaling_policy} "
-            f"COMMENT = '{comment}'"
+        sql_query = build(
+            "CREATE WAREHOUSE IF NOT EXISTS",
+            ident(wh_name),
+            {
+                "WAREHOUSE_SIZE": Keyword(size),
+                "WAREHOUSE_TYPE": Keyword(wh_type),
+                "AUTO_SUSPEND": auto_suspend,
+                "AUTO_RESUME": auto_resume,
+                "MIN_CLUSTER_COUNT": min_cluster_count,
+                "MAX_CLUSTER_COUNT": max_cluster_count,
+                "SCALING_POLICY": Keyword(scaling_policy),
+                "COMMENT": comment,
+            },
         )
 
         print(f"Creating warehouse ({wh_name})...")
@@ -93,11 +156,37 @@ class SnowflakeClient:
         msg = "Warehouse creation request did not go through"
         self._check_response(resp, msg)
 
+    def alter_warehouse(
+            self,
+            wh_name: str,
+            size: Union[str, None] = None,
+            scaling_policy: Union[str, None] = None,
+            auto_suspend: Union[int, None] = None,
+            min_cluster_count: Union[int, None] = None,
+            max_cluster_count: Union[int, None] = None,
+    ):
+
+        _settings = {
+            "WAREHOUSE_SIZE": Keyword(size) if size else None,
+            "AUTO_SUSPEND": auto_suspend,
+            "MIN_CLUSTER_COUNT": min_cluster_count,
+            "MAX_CLUSTER_COUNT": max_cluster_count,
+            "SCALING_POLICY": Keyword(scaling_policy) if scaling_policy else None,
+        }
+        if all(value is None for value in _settings.values()):
+            raise ValueError("Please provide at least one warehouse setting to alter")
+
+        sql_query = build("ALTER WAREHOUSE IF EXISTS", ident(wh_name), body="SET", options=_settings)
+
+        print(f"Altering warehouse ({wh_name})...")
+
+        resp = self._query_fetchone(sql_query)
+
+        msg = "Warehouse alteration request did not go through"
+        self._check_response(resp, msg)
+
     def create_database(self, db_name: str, comment: Union[str, None] = None):
-        if comment:
-            sql_query = f"CREATE DATABASE IF NOT EXISTS {db_name} COMMENT = '{comment}';"
-        else:
-            sql_query = f"CREATE DATABASE IF NOT EXISTS {db_name};"
+        sql_query = build("CREATE DATABASE IF NOT EXISTS", ident(db_name), {"COMMENT": comment})
 
         print(f"Creating database ({db_name})...")
         resp = self._query_fetchone(sql_query)
@@ -118,16 +207,11 @@ class SnowflakeClient:
             else:
                 db_name = self._database
 
-        _schema = f'"{db_name}"."{schema_name}"'
+        _managed_access = "WITH MANAGED ACCESS" if is_managed_access else None
 
-        _managed_access = " "
-        if is_managed_access:
-            _managed_access += "WITH MANAGED ACCESS "
-
-        if comment:
-            sql_query = f"CREATE SCHEMA IF NOT EXISTS {_schema}{_managed_access}COMMENT = '{comment}';"
-        else:
-            sql_query = f"CREATE SCHEMA IF NOT EXISTS {_schema}{_managed_access};"
+        sql_query = build(
+            "CREATE SCHEMA IF NOT EXISTS", qualified(db_name, schema_name), {"COMMENT": comment}, body=_managed_access
+        )
 
         print(f"Creating schema ({schema_name.upper()})...")
         resp = self._query_fetchone(sql_query)
@@ -192,8 +276,7 @@ class SnowflakeClient:
                 db_name = self._database
 
         if self.schema_exists(schema_name, db_name):
-            _schema_name = f'"{db_name.upper()}".{schema_name.upper()}'
-            is_successfully_executed = self._use_resource("SCHEMAS", _schema_name)
+            is_successfully_executed = self._use_resource("SCHEMAS", db_name, schema_name)
             if is_successfully_executed:
                 self._database = db_name.upper()
                 self._schema = schema_name.upper()
@@ -224,31 +307,80 @@ class SnowflakeClient:
             _schema_name = f'"{self._database.upper()}".{self._schema.upper()}'
             return _schema_name
 
-    def execute_query(self, sql_query: str):
-        pass
+    def execute_query(self, sql_query: str, params: Union[Sequence, None] = None):
+        return self._query_fetchall(sql_query, params)
+
+    def fetch_spilled(self, sql_query: str, params: Union[Sequence, None] = None, reuse: bool = False,
+                      max_age: Union[float, None] = None) -> SpilledResult:
+        """Fetch a result too large for memory: batches are streamed to the on-disk result cache and the
+        returned result is memory-mapped from there, so it can be sliced and re-iterated without re-querying.
+
+        Every call runs the statement again unless `reuse` is set; a reused result must also be younger than
+        `max_age` seconds when one is given."""
+
+        result_cache = self._result_cache or self.enable_result_cache()
+        key = result_cache.key(sql_query, params, (self._role, self._database, self._schema))
+        if reuse:
+            cached = result_cache.get(key, max_age)
+            if cached is not None:
+                return cached
+
+        try:
+            self._execute(sql_query, params)
+            return result_cache.spill(key, self.cursor)
+
+        except sfconn.errors.Error:
+            raise
+
+        finally:
+            self.cursor.close()
 
     def _show_resources(self, resource_type: str, target_index: int, in_acc_or_db: Union[str, None] = None) -> list:
         if resource_type.upper() not in SnowflakeConfig.SNOWFLAKE_RESOURCE_TYPES:
             raise ValueError(f"InvalidresourceType: expected one of: {SnowflakeConfig.SNOWFLAKE_RESOURCE_TYPES}")
         else:
-            _in = f' IN {in_acc_or_db.upper()}' if in_acc_or_db else ''
-            sql_query = f"SHOW {resource_type.upper()}{_in};"
+            if in_acc_or_db:
+                sql_query = build(f"SHOW {resource_type.upper()} IN", ident(in_acc_or_db))
+            else:
+                sql_query = build(f"SHOW {resource_type.upper()}")
 
             resources = self._query_fetchall(sql_query)
             return [resource[target_index] for resource in resources]
 
-    def _use_resource(self, resource_type: str, resource_name: str):
+    def _use_resource(self, resource_type: str, *name_parts: str):
         if resource_type.upper() not in SnowflakeConfig.SNOWFLAKE_RESOURCE_TYPES:
             raise ValueError(f"InvalidResourceType: expected one of: {SnowflakeConfig.SNOWFLAKE_RESOURCE_TYPES}")
         else:
             singular_form = resource_type.upper()[:-1]
-            sql_query = f"USE {singular_form} {resource_name.upper()};"
+            sql_query = build(f"USE {singular_form}", qualified(*name_parts))
             resp_mes = self._query_fetchone(sql_query)
-            return str(resp_mes).find("succe") != -1
-
-    def _query_fetchone(self, sql_query: str):
+            is_successfully_executed = str(resp_mes).find("succe") != -1
+            if is_successfully_executed:
+                self._adopt_session_context()
+            return is_successfully_executed
+
+    def _adopt_session_context(self):
+        # a USE can move other parts of the context too (USE DATABASE switches to its PUBLIC schema), so after
+        # the client's own USE the server-side context becomes the expected one instead of being read as drift
+        self._role = self._conn.role.upper() if self._conn.role else None
+        self._warehouse = self._conn.warehouse.upper() if self._conn.warehouse else None
+        self._database = self._conn.database.upper() if self._conn.database else None
+        self._schema = self._conn.schema.upper() if self._conn.schema else None
+
+    def _execute(self, sql_query: str, params: Union[Sequence, None] = None):
+        # the cursor is obtained first so login, warm-up and context restoring are not timed as part of the query
+        cs = self.cursor
+        started_at = time.perf_counter()
+        cs.execute(sql_query, params)
+        elapsed = time.perf_counter() - started_at
+
+        self._report_first_query()
+        if self._slow_query_log:
+            self._slow_query_log.observe(self._conn, sql_query, cs.sfqid, elapsed)
+
+    def _query_fetchone(self, sql_query: str, params: Union[Sequence, None] = None):
         try:
-            self.cursor.execute(sql_query)
+            self._execute(sql_query, params)
             resp = self.cursor.fetchone()
             return resp[0]
 
@@ -258,10 +390,10 @@ class SnowflakeClient:
         finally:
             self.cursor.close()
 
-    def _query_fetchall(self, sql_query: str):
+    def _query_fetchall(self, sql_query: str, params: Union[Sequence, None] = None):
         try:
-            self.cursor.execute(sql_query)
-            resp = sfc.cursor.fetchall()
+            self._execute(sql_query, params)
+            resp = self.cursor.fetchall()
             return resp
 
         except sfconn.errors.Error:
@@ -271,29 +403,87 @@ class SnowflakeClient:
             self.cursor.close()
 
     def _create_conn(self):
+        self._wait_for_warm_up()
+
         if not self._user or not self._password or not self._account:
             raise sfconn.errors.Error(msg="Missing username/password/account. Please create new connection.")
 
-        if not self._conn or self._conn.is_closed():
-            try:
-                self._conn = sfconn.connect(
-                    user=self._user,
-                    password=self._password,
-                    account=self._account,
-                    warehouse=self._warehouse,
-                    database=self._database,
-                    schema=self._schema,
-                )
-                return self._conn
+        with self._conn_lock:
+            if not self._conn or self._conn.is_closed():
+                attempt_count = 0
+                while True:
+                    try:
+                        login_started_at = time.perf_counter()
+                        self._conn = sfconn.connect(
+                            user=self._user,
+                            password=self._password,
+                            account=self._account,
+                            role=self._role,
+                            warehouse=self._warehouse,
+                            database=self._database,
+                            schema=self._schema,
+                            paramstyle="qmark",
+                            client_session_keep_alive=SnowflakeConfig.KEEP_ALIVE,
+                            client_session_keep_alive_heartbeat_frequency=SnowflakeConfig.HEARTBEAT_FREQUENCY,
+                        )
+                        self._login_elapsed = time.perf_counter() - login_started_at
+                        return self._conn
+
+                    except sfconn.errors.OperationalError:
+                        # network/transient failures: retry with a bounded exponential backoff
+                        if attempt_count >= SnowflakeConfig.RECONNECT_ATTEMPTS:
+                            raise
+                        backoff = min(
+                            SnowflakeConfig.RECONNECT_BACKOFF * 2 ** attempt_count,
+                            SnowflakeConfig.RECONNECT_MAX_BACKOFF,
+                        )
+                        attempt_count += 1
+                        print(f"Connection failed. Reconnecting in {backoff:.1f}s (attempt {attempt_count})...")
+                        time.sleep(backoff)
+
+                    except sfconn.errors.DatabaseError as db_ex:
+                        if db_ex.errno == 250001:
+                            raise sfconn.errors.DatabaseError(msg="Invalid username/password. Please please re-enter.")
+                        else:
+                            raise sfconn.errors.DatabaseError
+
+                    except sfconn.errors.Error:
+                        raise
+
+            return self._conn
+
+    def _ensure_context(self):
+        # the connector tracks the server-side session context after every statement, so drift is detected
+        # without a round trip and only the drifted parts are re-applied in one multi-statement request
+        desired = {
+            "ROLE": (self._role, self._conn.role),
+            "WAREHOUSE": (self._warehouse, self._conn.warehouse),
+            "DATABASE": (self._database, self._conn.database),
+            "SCHEMA": (self._schema, self._conn.schema),
+        }
+        drifted = [name for name, (wanted, actual) in desired.items() if wanted and wanted != str(actual).upper()]
+        if not drifted:
+            return
+
+        statements = []
+        for name in drifted:
+            if name == "SCHEMA":
+                statements.append(build("USE SCHEMA", qualified(self._database, self._schema)))
+            else:
+                statements.append(build(f"USE {name}", ident(desired[name][0])))
 
-            except sfconn.errors.DatabaseError as db_ex:
-                if db_ex.errno == 250001:
-                    raise sfconn.errors.DatabaseError(msg="Invalid username/password. Please please re-enter.")
-                else:
-                    raise sfconn.errors.DatabaseError
+        cs = self._conn.cursor()
+        try:
+            cs.execute(" ".join(statements), num_statements=len(statements))
+        finally:
+            cs.close()
 
-            except sfconn.errors.Error:
-                raise
+    def _report_first_query(self):
+        if not self._is_first_query_reported:
+            self._is_first_query_reported = True
+            elapsed = time.perf_counter() - self._started_at
+            login = f"{self._login_elapsed:.3f}s" if self._login_elapsed is not None else "n/a"
+            print(f"First query completed {elapsed:.3f}s after start-up (login: {login})")
 
     def create_table(self, tbl_name: str, column_creation_str: str, db_name: Union[str, None] = None,
                      schema_name: Union[str, None] = None,
@@ -311,16 +501,10 @@ class SnowflakeClient:
             else:
                 schema_name = self._schema
 
-        _table = f'"{db_name.upper()}"."{schema_name.upper()}"."{tbl_name.upper()}"'
+        _create_or_replace = 'CREATE OR REPLACE TABLE' if to_replace else 'CREATE TABLE IF NOT EXISTS'
 
-        _field_creation_str = f" ({column_creation_str})"
-
-        _create_or_replace = 'CREATE OR REPLACE TABLE ' if to_replace else 'CREATE TABLE IF NOT EXISTS '
-
-        if comment:
-            sql_query = f"{_create_or_replace}{_table}{_field_creation_str} COMMENT = '{comment}';"
-        else:
-            sql_query = f"CREATE TABLE IF NOT EXISTS {_table}{_field_creation_str};"
+        sql_query = build(_create_or_replace, qualified(db_name, schema_name, tbl_name), {"COMMENT": comment},
+                          body=f"({column_creation_str})")
 
         print(f"Creating table ({tbl_name.upper()})...")
         resp = self._query_fetchone(sql_query)
@@ -331,7 +515,8 @@ class SnowflakeClient:
     def create_csv_file_format(self, ff_name: str, db_name: Union[str, None] = None,
                                schema_name: Union[str, None] = None, compression: str = 'AUTO',
                                field_delimiter: str = r',', record_delimiter: str = r'\n', skip_header: int = 0,
-                               trim_space: bool = False, null_if: str = r'\\N'):
+                               trim_space: bool = False, null_if: str = r'\\N',
+                               field_optionally_enclosed_by: str = 'NONE'):
 
         if not db_name:
             if not self._database:
@@ -345,15 +530,22 @@ class SnowflakeClient:
             else:
                 schema_name = self._schema
 
-        _ff_name = f'"{db_name.upper()}"."{schema_name.upper()}".{ff_name.upper()}'
-
-        sql_query = f"CREATE FILE FORMAT IF NOT EXISTS {_ff_name} TYPE = 'CSV' COMPRESSION = '{compression}' " \
-                    f"FIELD_DELIMITER = '{field_delimiter}' RECORD_DELIMITER = '{record_delimiter}' " \
-                    f"SKIP_HEADER = {skip_header} " \
-                    f"FIELD_OPTIONALLY_ENCLOSED_BY = 'NONE' TRIM_SPACE = {'TRUE' if trim_space else 'FALSE'} " \
-                    f"ERROR_ON_COLUMN_COUNT_MISMATCH = TRUE ESCAPE = 'NONE' " \
-                    f"ESCAPE_UNENCLOSED_FIELD = '\\134' DATE_FORMAT = 'AUTO' " \
-                    f"TIMESTAMP_FORMAT = 'AUTO' NULL_IF = ('{null_if}');"
+        sql_query = build("CREATE FILE FORMAT IF NOT EXISTS", qualified(db_name, schema_name, ff_name), {
+            "TYPE": "CSV",
+            "COMPRESSION": compression,
+            # delimiters and NULL_IF are given in Snowflake's escape syntax (r'\t', r'\\N'), so they pass as written
+            "FIELD_DELIMITER": Escaped(field_delimiter),
+            "RECORD_DELIMITER": Escaped(record_delimiter),
+            "SKIP_HEADER": skip_header,
+            "FIELD_OPTIONALLY_ENCLOSED_BY": field_optionally_enclosed_by,
+            "TRIM_SPACE": trim_space,
+            "ERROR_ON_COLUMN_COUNT_MISMATCH": True,
+            "ESCAPE": "NONE",
+            "ESCAPE_UNENCLOSED_FIELD": Escaped(r"\134"),
+            "DATE_FORMAT": "AUTO",
+            "TIMESTAMP_FORMAT": "AUTO",
+            "NULL_IF": (Escaped(null_if),),
+        })
 
         print(f"Creating CSV file format ({ff_name.upper()})...")
         resp = self._query_fetchone(sql_query)
@@ -380,25 +572,56 @@ class SnowflakeClient:
             else:
                 schema_name = self._schema
 
-        _ff_name = f'"{db_name.upper()}"."{schema_name.upper()}".{ff_name.upper()}'
-
-        _sql_query = f"CREATE FILE FORMAT IF NOT EXISTS {_ff_name} TYPE = 'JSON' COMPRESSION = '{compression}' " \
-                     f"ENABLE_OCTAL = {'TRUE' if enable_octal else 'FALSE'} " \
-                     f"ALLOW_DUPLICATE = {'TRUE' if allow_duplicate else 'FALSE'} " \
-                     f"STRIP_OUTER_ARRAY = {'TRUE' if strip_outer_array else 'FALSE'} " \
-                     f"STRIP_NULL_VALUES = {'TRUE' if strip_null_values else 'FALSE'} " \
-                     f"IGNORE_UTF8_ERRORS = {'TRUE' if ignore_utf8_errors else 'FALSE'}"
-
-        if comment:
-            sql_query = f"{_sql_query} COMMENT = '{comment}';"
-        else:
-            sql_query = f"{_sql_query};"
+        sql_query = build("CREATE FILE FORMAT IF NOT EXISTS", qualified(db_name, schema_name, ff_name), {
+            "TYPE": "JSON",
+            "COMPRESSION": compression,
+            "ENABLE_OCTAL": enable_octal,
+            "ALLOW_DUPLICATE": allow_duplicate,
+            "STRIP_OUTER_ARRAY": strip_outer_array,
+            "STRIP_NULL_VALUES": strip_null_values,
+            "IGNORE_UTF8_ERRORS": ignore_utf8_errors,
+            "COMMENT": comment,
+        })
 
         print(f"Creating JSON file format ({ff_name.upper()})...")
         resp = self._query_fetchone(sql_query)
         msg = "JSON file format creation request did not go through"
         self._check_response(resp, msg)
 
+    def create_parquet_file_format(self, ff_name: str, db_name: Union[str, None] = None,
+                                   schema_name: Union[str, None] = None, compression: str = 'AUTO',
+                                   binary_as_text: bool = True, trim_space: bool = False, null_if: str = r'\\N',
+                                   comment: Union[str, None] = None):
+
+        if not db_name:
+            if not self._database:
+                raise ValueError("Please provide database name (db_name)")
+            else:
+                db_name = self._database
+
+        if not schema_name:
+            if not self._schema:
+                raise ValueError("Please provide database name (schema_name)")
+            else:
+                schema_name = self._schema
+
+        _ff_name = qualified(db_name, schema_name, ff_name)
+
+        sql_query = build("CREATE FILE FORMAT IF NOT EXISTS", _ff_name, {
+            "TYPE": "PARQUET",
+            "COMPRESSION": compression,
+            "BINARY_AS_TEXT": binary_as_text,
+            "TRIM_SPACE": trim_space,
+            "NULL_IF": (Escaped(null_if),),
+            "COMMENT": comment,
+        })
+
+        print(f"Creating Parquet file format ({ff_name.upper()})...")
+        resp = self._query_fetchone(sql_query)
+        msg = "Parquet file format creation request did not go through"
+        if self._check_response(resp, msg):
+            return _ff_name
+
     @staticmethod
     def _check_response(resp, exception_message: str):
         if str(resp).find("succe") != -1:
@@ -423,13 +646,9 @@ class SnowflakeClient:
             else:
                 schema_name = self._schema
 
-        _stage_name = f'"{db_name.upper()}"."{schema_name.upper()}".{stage_name.upper()}'
-        _sql_query = f'CREATE STAGE IF NOT EXISTS "{db_name.upper()}"."{schema_name.upper()}".{stage_name.upper()}'
+        _stage_name = qualified(db_name, schema_name, stage_name)
 
-        if comment:
-            sql_query = f"{_sql_query} COMMENT = '{comment}';"
-        else:
-            sql_query = f"{_sql_query};"
+        sql_query = build("CREATE STAGE IF NOT EXISTS", _stage_name, {"COMMENT": comment})
 
         print(f"Creating stage ({stage_name.upper()})...")
         resp = self._query_fetchone(sql_query)
@@ -441,6 +660,172 @@ class SnowflakeClient:
 
         pass
 
+    def put_files(self, filepaths: List[str], stage_name: str, auto_compress: bool = False, parallel: int = 4,
+                  overwrite: bool = False) -> List[str]:
+        # stage_name is a fully qualified stage as returned by create_stage_snowflake
+        staged = []
+        for filepath in filepaths:
+            _filepath = os.path.abspath(filepath).replace("\\", "/")
+            sql_query = f"PUT 'file://{_filepath}' @{stage_name} " \
+                        f"AUTO_COMPRESS = {'TRUE' if auto_compress else 'FALSE'} PARALLEL = {parallel} " \
+                        f"OVERWRITE = {'TRUE' if overwrite else 'FALSE'};"
+
+            print(f"Uploading ({os.path.basename(filepath)}) to stage ({stage_name})...")
+            resp = self._query_fetchall(sql_query)
+            # PUT reports a file whose name is already on the stage as SKIPPED and leaves the old copy in place
+            skipped = [row[1] for row in resp if str(row[6]).upper() == "SKIPPED"]
+            if skipped:
+                raise sfconn.errors.BadRequest(
+                    msg=f"Files already on stage ({stage_name}) were not replaced: {skipped}; use overwrite=True"
+                )
+            staged.extend(row[1] for row in resp)
+
+        return staged
+
+    def copy_into_table(self, tbl_name: str, stage_name: str, ff_name: str, files: Union[List[str], None] = None,
+                        pattern: Union[str, None] = None, match_by_column_name: str = 'CASE_INSENSITIVE',
+                        on_error: str = 'ABORT_STATEMENT', purge: bool = False,
+                        db_name: Union[str, None] = None, schema_name: Union[str, None] = None):
+
+        if not db_name:
+            if not self._database:
+                raise ValueError("Please provide database name (db_name)")
+            else:
+                db_name = self._database
+
+        if not schema_name:
+            if not self._schema:
+                raise ValueError("Please provide database name (schema_name)")
+            else:
+                schema_name = self._schema
+
+        _table = qualified(db_name, schema_name, tbl_name)
+
+        sql_query = f"COPY INTO {_table} FROM @{stage_name} FILE_FORMAT = (FORMAT_NAME = '{ff_name}')"
+        if files:
+            sql_query += f" FILES = {literal(tuple(files))}"
+        elif pattern:
+            sql_query += f" PATTERN = {literal(pattern)}"
+        if match_by_column_name and match_by_column_name.upper() != 'NONE':
+            sql_query += f" MATCH_BY_COLUMN_NAME = {match_by_column_name.upper()}"
+        sql_query += f" ON_ERROR = {on_error} PURGE = {'TRUE' if purge else 'FALSE'};"
+
+        print(f"Copying into table ({tbl_name.upper()}) from stage ({stage_name})...")
+        return self._query_fetchall(sql_query)
+
+    def load_parquet(self, tbl_name: str, filepaths: List[str], stage_name: str, ff_name: str,
+                     db_name: Union[str, None] = None, schema_name: Union[str, None] = None,
+                     overwrite: bool = False):
+        # the Parquet files are already compressed column by column, so PUT must not gzip them again
+        staged = self.put_files(filepaths, stage_name, auto_compress=False, overwrite=overwrite)
+        return self.copy_into_table(tbl_name, stage_name, ff_name, files=staged, db_name=db_name,
+                                    schema_name=schema_name)
+
+    def upsert_rows(self, tbl_name: str, columns: Sequence[str], rows: Iterable[Sequence], key_columns: Sequence[str],
+                    use_put: bool = False, batch_size: int = 16384, db_name: Union[str, None] = None,
+                    schema_name: Union[str, None] = None,
+                    insert_only_columns: Union[Sequence[str], None] = None) -> dict:
+        # insert_only_columns are written for new rows but never updated on matched ones, e.g. the primary key
+        # when rows are matched on another unique key
+
+        if not db_name:
+            if not self._database:
+                raise ValueError("Please provide database name (db_name)")
+            else:
+                db_name = self._database
+
+        if not schema_name:
+            if not self._schema:
+                raise ValueError("Please provide database name (schema_name)")
+            else:
+                schema_name = self._schema
+
+        _columns = [column.upper() for column in columns]
+        _key_columns = [column.upper() for column in key_columns]
+        if not set(_key_columns).issubset(_columns):
+            raise ValueError(f"InvalidKeyColumns: expected a subset of: {_columns}")
+
+        _table = qualified(db_name, schema_name, tbl_name)
+        _stage_tbl_name = f"{tbl_name.upper()}_UPSERT_{uuid.uuid4().hex[:8].upper()}"
+        _stage_table = qualified(db_name, schema_name, _stage_tbl_name)
+        _column_list = ", ".join(f'"{column}"' for column in _columns)
+
+        self._query_fetchone(f"CREATE TEMPORARY TABLE {_stage_table} LIKE {_table};")
+        try:
+            print(f"Staging rows for upsert into table ({tbl_name.upper()})...")
+            if use_put:
+                staged_count = self._stage_rows_put(_stage_table, _column_list, rows)
+            else:
+                staged_count = self._stage_rows_bind(_stage_table, _column_list, len(_columns), rows, batch_size)
+
+            _on = " AND ".join(f'T."{column}" = S."{column}"' for column in _key_columns)
+            _insert_only_columns = {column.upper() for column in insert_only_columns or ()}
+            _value_columns = [
+                column for column in _columns if column not in _key_columns and column not in _insert_only_columns
+            ]
+            sql_query = f"MERGE INTO {_table} T USING {_stage_table} S ON {_on}"
+            if _value_columns:
+                # only rows whose values really differ are updated, so unchanged rows are not rewritten
+                _changed = " OR ".join(f'NOT EQUAL_NULL(T."{column}", S."{column}")' for column in _value_columns)
+                _set = ", ".join(f'T."{column}" = S."{column}"' for column in _value_columns)
+                sql_query += f" WHEN MATCHED AND ({_changed}) THEN UPDATE SET {_set}"
+            _values = ", ".join(f'S."{column}"' for column in _columns)
+            sql_query += f" WHEN NOT MATCHED THEN INSERT ({_column_list}) VALUES ({_values});"
+
+            print(f"Merging {staged_count} rows into table ({tbl_name.upper()})...")
+            resp = self._query_fetchall(sql_query)
+
+        finally:
+            self._query_fetchone(f"DROP TABLE IF EXISTS {_stage_table};")
+
+        inserted = resp[0][0]
+        updated = resp[0][1] if _value_columns else 0
+        counts = {"inserted": inserted, "updated": updated, "unchanged": staged_count - inserted - updated}
+        print(f"Upsert result: {counts}")
+        return counts
+
+    def _stage_rows_bind(self, stage_table: str, column_list: str, column_count: int, rows: Iterable[Sequence],
+                         batch_size: int) -> int:
+        # with qmark binding the connector sends each executemany batch as bound arrays in a single request
+        sql_query = f"INSERT INTO {stage_table} ({column_list}) VALUES ({', '.join(['?'] * column_count)})"
+        staged_count = 0
+        rows = iter(rows)
+        try:
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                self.cursor.executemany(sql_query, batch)
+                staged_count += len(batch)
+        except sfconn.errors.Error:
+            raise
+        finally:
+            self.cursor.close()
+
+        return staged_count
+
+    def _stage_rows_put(self, stage_table: str, column_list: str, rows: Iterable[Sequence]) -> int:
+        # large inputs: write one gzipped CSV, PUT it to the temporary table's own stage and COPY it in
+        staged_count = 0
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "upsert.csv.gz")
+            with gzip.open(filepath, "wt", newline="") as csv_file:
+                for row in rows:
+                    # every value is enclosed, so only a NULL is written as an empty (unenclosed) field
+                    csv_file.write(",".join(
+                        "" if value is None else '"' + str(value).replace('"', '""') + '"' for value in row
+                    ) + "\n")
+                    staged_count += 1
+
+            _table_stage = f"{stage_table.rsplit('.', 1)[0]}.%{stage_table.rsplit('.', 1)[1]}"
+            self.put_files([filepath], _table_stage, auto_compress=False)
+
+        sql_query = f"COPY INTO {stage_table} ({column_list}) FROM @{_table_stage} " \
+                    f"FILE_FORMAT = (TYPE = 'CSV' COMPRESSION = 'GZIP' FIELD_OPTIONALLY_ENCLOSED_BY = '\"' " \
+                    f"ESCAPE_UNENCLOSED_FIELD = NONE EMPTY_FIELD_AS_NULL = TRUE NULL_IF = ()) PURGE = TRUE;"
+        self._query_fetchall(sql_query)
+        return staged_count
+
 
 if __name__ == "__main__":
     sfc = SnowflakeClient()
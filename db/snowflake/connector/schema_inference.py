@@ -0,0 +1,212 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from db.snowflake.connector.pyconn import SnowflakeClient
+from db.snowflake.connector.sqlbuilder import ident
+
+BOOLEAN_WORDS = pa.array(["true", "false", "t", "f", "yes", "no", "y", "n"])
+MAX_NUMBER_PRECISION = 38
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+_NUMBER = r"^[+-]?(\d+(\.\d+)?|\.\d+)$"
+_INTEGER_DIGITS = r"^[+-]?0*(\d*)(\.\d*)?$"
+_UP_TO_DOT = r"^[^.]*\.?"
+
+
+class _ColumnStats:
+    """Running type evidence for one column, narrowed chunk by chunk."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seen = 0
+        self.is_nullable = False
+        self.max_length = 0
+        self.could_be_boolean = True
+        self.could_be_number = True
+        self.could_be_float = True
+        self.could_be_date = True
+        self.could_be_timestamp = True
+        self.max_int_digits = 0
+        self.max_scale = 0
+
+    def update(self, values: pa.Array, null_if: str):
+        is_null = pc.or_(pc.equal(values, ""), pc.equal(values, null_if))
+        if pc.any(is_null).as_py():
+            self.is_nullable = True
+            values = pc.filter(values, pc.invert(is_null))
+        if not len(values):
+            return
+
+        self.seen += len(values)
+        self.max_length = max(self.max_length, pc.max(pc.utf8_length(values)).as_py())
+
+        # every candidate is checked against every chunk, so one chunk can rule a type out for the whole column
+        if self.could_be_boolean:
+            self.could_be_boolean = pc.all(pc.is_in(pc.utf8_lower(values), value_set=BOOLEAN_WORDS)).as_py()
+
+        if self.could_be_number:
+            self._update_number(values)
+
+        if self.could_be_float:
+            self.could_be_float = _all_cast(values, pa.float64())
+        if self.could_be_date:
+            self.could_be_date = _all_cast(values, pa.date32())
+        if self.could_be_timestamp:
+            self.could_be_timestamp = _all_cast(values, pa.timestamp("us"))
+
+    def _update_number(self, values: pa.Array):
+        if not pc.all(pc.match_substring_regex(values, _NUMBER)).as_py():
+            self.could_be_number = False
+            return
+
+        int_digits = pc.utf8_length(pc.replace_substring_regex(values, _INTEGER_DIGITS, r"\1"))
+        scale = pc.utf8_length(pc.replace_substring_regex(values, _UP_TO_DOT, ""))
+        self.max_int_digits = max(self.max_int_digits, pc.max(int_digits).as_py())
+        self.max_scale = max(self.max_scale, pc.max(scale).as_py())
+
+    @property
+    def sql_type(self) -> str:
+        if not self.seen:
+            return "VARCHAR"
+        if self.could_be_number:
+            precision = max(self.max_int_digits + self.max_scale, 1)
+            if precision <= MAX_NUMBER_PRECISION:
+                return f"NUMBER({precision}, {self.max_scale})"
+            return "FLOAT"
+        if self.could_be_boolean:
+            return "BOOLEAN"
+        if self.could_be_float:
+            return "FLOAT"
+        if self.could_be_date:
+            return "DATE"
+        if self.could_be_timestamp:
+            return "TIMESTAMP_NTZ"
+        return f"VARCHAR({max(self.max_length, 1)})"
+
+
+def _all_cast(values: pa.Array, target_type: pa.DataType) -> bool:
+    try:
+        pc.cast(values, target_type)
+        return True
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return False
+
+
+class InferredSchema:
+    def __init__(self, columns: List[_ColumnStats], rows: int, delimiter: str, null_if: str, is_quoted: bool):
+        self.columns = columns
+        self.rows = rows
+        self.delimiter = delimiter
+        self.null_if = null_if
+        self.is_quoted = is_quoted
+
+    @property
+    def column_types(self) -> List[Tuple[str, str, bool]]:
+        return [(column.name, column.sql_type, column.is_nullable) for column in self.columns]
+
+    @property
+    def column_creation_str(self) -> str:
+        """Ready to pass to SnowflakeClient.create_table."""
+
+        return ", ".join(
+            f"{ident(name)} {sql_type}{'' if is_nullable else ' NOT NULL'}"
+            for name, sql_type, is_nullable in self.column_types
+        )
+
+    @property
+    def file_format_options(self) -> Dict[str, object]:
+        """Keyword arguments for SnowflakeClient.create_csv_file_format that match the inspected file."""
+
+        return {
+            "field_delimiter": self.delimiter,
+            "skip_header": 1,
+            "null_if": self.null_if.replace("\\", "\\\\"),
+            "field_optionally_enclosed_by": '"' if self.is_quoted else "NONE",
+        }
+
+
+def infer_csv_schema(
+        csv_filepath: str,
+        delimiter: str = ",",
+        null_if: str = "\\N",
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        sample_rows: Optional[int] = None,
+) -> InferredSchema:
+    """Infer Snowflake column types for a CSV file with a header row.
+
+    The file is tokenised by Arrow's streaming reader and every block is checked column-wise with vectorised
+    Arrow compute kernels on the string arrays themselves, so no per-cell Python objects are created and memory
+    stays bounded by `memory_budget` whatever the file size. Pass `sample_rows` to stop after the first rows
+    instead of streaming the whole file.
+    """
+
+    # a block stays about its size as Arrow strings; the kernels' temporaries are a few more blocks at most
+    block_size = max(memory_budget // 8, 1024 * 1024)
+
+    with open(csv_filepath, "rb") as csv_file:
+        is_quoted = b'"' in csv_file.read(block_size)
+
+    header = pa_csv.open_csv(
+        csv_filepath,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+    ).schema.names
+    reader = pa_csv.open_csv(
+        csv_filepath,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in header}, strings_can_be_null=False, null_values=[]
+        ),
+    )
+
+    columns = [_ColumnStats(name) for name in header]
+    rows = 0
+    for batch in reader:
+        if sample_rows is not None and rows + batch.num_rows > sample_rows:
+            batch = batch.slice(0, sample_rows - rows)
+
+        for column, array in zip(columns, batch.columns):
+            column.update(array, null_if)
+        rows += batch.num_rows
+
+        if sample_rows is not None and rows >= sample_rows:
+            break
+
+    return InferredSchema(columns, rows, delimiter, null_if, is_quoted)
+
+
+def create_table_from_csv(
+        sfc: SnowflakeClient,
+        csv_filepath: str,
+        tbl_name: str,
+        ff_name: str,
+        db_name: Optional[str] = None,
+        schema_name: Optional[str] = None,
+        **infer_kwargs,
+) -> InferredSchema:
+    """Create a table typed after the CSV file together with a file format that loads it as inspected."""
+
+    schema = infer_csv_schema(csv_filepath, **infer_kwargs)
+    sfc.create_table(tbl_name, schema.column_creation_str, db_name=db_name, schema_name=schema_name)
+    sfc.create_csv_file_format(ff_name, db_name=db_name, schema_name=schema_name, **schema.file_format_options)
+    return schema
+
+
+if __name__ == "__main__":
+    is_to_test_run = True
+    data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "..", "data")
+    if is_to_test_run:
+        schema = infer_csv_schema(os.path.join(data_dir, "cars.csv"))
+        print(f"Inferred from {schema.rows} rows:")
+        print(schema.column_creation_str)
+        print(schema.file_format_options)
+    else:
+        sfc = SnowflakeClient()
+        sfc.open_connection()
+        create_table_from_csv(sfc, os.path.join(data_dir, "cars.csv"), "CARS", "CARS_CSV", "SALES", "DIMENSIONS")
+        sfc.close_connection()
@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+current = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(current))))
+
+import snowflake.connector as sfconn
+
+from config.config import SnowflakeConfig
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql_query: str) -> str:
+    """Normalise literals and whitespace away so statements of the same shape share a fingerprint."""
+
+    normalised = _STRING_LITERAL.sub("?", sql_query)
+    normalised = _NUMBER_LITERAL.sub("?", normalised)
+    normalised = _WHITESPACE.sub(" ", normalised).strip().rstrip(";").upper()
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """Opt-in recorder for statements slower than a threshold, stored as JSON lines in rotating files."""
+
+    def __init__(
+            self,
+            path: str = SnowflakeConfig.SLOW_QUERY_LOG_PATH,
+            threshold: float = SnowflakeConfig.SLOW_QUERY_THRESHOLD,
+            max_bytes: int = SnowflakeConfig.SLOW_QUERY_LOG_MAX_BYTES,
+            backup_count: int = SnowflakeConfig.SLOW_QUERY_LOG_BACKUPS,
+            capture_operator_stats: bool = True,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.backup_count = backup_count
+        self.capture_operator_stats = capture_operator_stats
+
+        self._logger: Optional[logging.Logger] = None
+        self._max_bytes = max_bytes
+
+    @property
+    def logger(self) -> logging.Logger:
+        if not self._logger:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=self._max_bytes, backupCount=self.backup_count)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+
+            self._logger = logging.getLogger(f"{__name__}.{os.path.abspath(self.path)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.handlers = [handler]
+
+        return self._logger
+
+    def observe(self, conn: sfconn.SnowflakeConnection, sql_query: str, query_id: Optional[str], elapsed: float):
+        if elapsed < self.threshold:
+            return None
+
+        record = {
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "fingerprint": fingerprint(sql_query),
+            "sql": sql_query,
+            "query_id": query_id,
+            "elapsed": round(elapsed, 3),
+        }
+        if query_id:
+            try:
+                record.update(self._query_history(conn, query_id))
+                if self.capture_operator_stats:
+                    record["operators"] = self._operator_stats(conn, query_id)
+            except sfconn.errors.Error as ex:
+                # profile capture is best-effort; the client-side timing is still worth keeping
+                record["profile_error"] = str(ex)
+
+        self.logger.info(json.dumps(record, default=str))
+        return record
+
+    @staticmethod
+    def _query_history(conn: sfconn.SnowflakeConnection, query_id: str) -> dict:
+        sql_query = (
+            "SELECT TOTAL_ELAPSED_TIME, COMPILATION_TIME, EXECUTION_TIME, "
+            "QUEUED_PROVISIONING_TIME + QUEUED_REPAIR_TIME + QUEUED_OVERLOAD_TIME, BYTES_SCANNED, WAREHOUSE_NAME "
+            "FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => 1000)) "
+            "WHERE QUERY_ID = ?"
+        )
+        cs = conn.cursor()
+        try:
+            cs.execute(sql_query, (query_id,))
+            row = cs.fetchone()
+        finally:
+            cs.close()
+
+        if not row:
+            return {}
+        return {
+            "server_elapsed_ms": row[0],
+            "compilation_ms": row[1],
+            "execution_ms": row[2],
+            "queued_ms": row[3],
+            "bytes_scanned": row[4],
+            "warehouse": row[5],
+        }
+
+    @staticmethod
+    def _operator_stats(conn: sfconn.SnowflakeConnection, query_id: str, top: int = 5) -> list:
+        sql_query = (
+            "SELECT OPERATOR_ID, OPERATOR_TYPE, EXECUTION_TIME_BREAKDOWN:overall_percentage::FLOAT AS PCT "
+            f"FROM TABLE(GET_QUERY_OPERATOR_STATS(?)) ORDER BY PCT DESC NULLS LAST LIMIT {int(top)}"
+        )
+        cs = conn.cursor()
+        try:
+            cs.execute(sql_query, (query_id,))
+            return [{"id": row[0], "type": row[1], "pct": row[2]} for row in cs.fetchall()]
+        finally:
+            cs.close()
+
+    def records(self):
+        paths = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as log_file:
+                for line in log_file:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def summarize(self, top: int = 10, order_by: str = "total") -> list:
+        groups = {}
+        for record in self.records():
+            group = groups.setdefault(
+                record["fingerprint"],
+                {"fingerprint": record["fingerprint"], "sql": record["sql"], "count": 0, "total": 0.0, "max": 0.0,
+                 "bytes_scanned": 0, "queued_ms": 0, "compilation_ms": 0},
+            )
+            group["count"] += 1
+            group["total"] += record["elapsed"]
+            group["max"] = max(group["max"], record["elapsed"])
+            for field in ("bytes_scanned", "queued_ms", "compilation_ms"):
+                group[field] += record.get(field) or 0
+
+        for group in groups.values():
+            group["mean"] = group["total"] / group["count"]
+
+        return sorted(groups.values(), key=lambda group: group[order_by], reverse=True)[:top]
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Summarize the slow-query log by SQL fingerprint.")
+    parser.add_argument("--path", default=SnowflakeConfig.SLOW_QUERY_LOG_PATH)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--order-by", choices=["total", "count", "max", "mean", "bytes_scanned"], default="total")
+    args = parser.parse_args(argv)
+
+    summary = SlowQueryLog(path=args.path).summarize(top=args.top, order_by=args.order_by)
+    if not summary:
+        print(f"No slow queries recorded in ({args.path}).")
+        return
+
+    print(f"{'FINGERPRINT':<14}{'COUNT':>7}{'TOTAL(s)':>11}{'MEAN(s)':>10}{'MAX(s)':>10}{'QUEUED(ms)':>12}"
+          f"{'MB SCANNED':>12}  SQL")
+    for group in summary:
+        sql_preview = _WHITESPACE.sub(" ", group["sql"])[:60]
+        print(f"{group['fingerprint']:<14}{group['count']:>7}{group['total']:>11.2f}{group['mean']:>10.2f}"
+              f"{group['max']:>10.2f}{group['queued_ms']:>12}{group['bytes_scanned'] / 1024 ** 2:>12.1f}  "
+              f"{sql_preview}")
+
+
+if __name__ == "__main__":
+    main()
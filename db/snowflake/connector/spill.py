@@ -0,0 +1,223 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+from snowflake.connector.cursor import SnowflakeCursor
+
+from config.config import SnowflakeConfig
+
+# cursor.description type code of NUMBER columns; up to 18 digits always fit an int64
+FIXED_TYPE_CODE = 0
+MAX_INT64_PRECISION = 18
+MAX_NUMBER_PRECISION = 38
+
+
+class SpilledResult:
+    """A query result kept in a memory-mapped Arrow IPC file.
+
+    Nothing is read into memory up front: slicing and column selection return new views over the same mapping,
+    and pages are only loaded from disk when rows are actually accessed. The result can be iterated any number
+    of times without going back to Snowflake.
+    """
+
+    def __init__(self, path: str, table: Optional[pa.Table] = None, source: Optional[pa.MemoryMappedFile] = None):
+        self.path = path
+        self._table = table
+        self._source = source
+
+    @property
+    def table(self) -> pa.Table:
+        if self._table is None:
+            self._source = pa.memory_map(self.path, "r")
+            # reading from a memory map is zero-copy, so this only maps the record batches
+            self._table = pa_ipc.open_file(self._source).read_all()
+        return self._table
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self.table.schema
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[tuple, "SpilledResult"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._view(self.table.slice(start, max(stop - start, 0)))
+            return self._view(self.table.take(pa.array(range(start, stop, step), type=pa.int64())))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SpilledResult index out of range")
+        return tuple(column[index].as_py() for column in self.table.columns)
+
+    def select(self, columns: Sequence[str]) -> "SpilledResult":
+        return self._view(self.table.select(list(columns)))
+
+    def page(self, number: int, page_size: int = 10000) -> "SpilledResult":
+        return self[number * page_size:(number + 1) * page_size]
+
+    def iter_batches(self, batch_size: int = 65536) -> Iterator[pa.RecordBatch]:
+        return iter(self.table.to_batches(max_chunksize=batch_size))
+
+    def __iter__(self) -> Iterator[tuple]:
+        for batch in self.iter_batches():
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    def to_arrow(self) -> pa.Table:
+        return self.table
+
+    def to_pylist(self) -> List[tuple]:
+        return list(self)
+
+    def close(self):
+        self._table = None
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def _view(self, table: pa.Table) -> "SpilledResult":
+        return SpilledResult(self.path, table, self._source)
+
+
+class ResultCache:
+    """On-disk cache of spilled query results, one Arrow IPC file per statement, evicted least recently used
+    first once the files exceed `max_bytes`."""
+
+    SUFFIX = ".arrow"
+
+    def __init__(
+            self,
+            cache_dir: str = SnowflakeConfig.RESULT_CACHE_DIR,
+            max_bytes: int = SnowflakeConfig.RESULT_CACHE_MAX_BYTES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(sql_query: str, params: Optional[Sequence] = None, context: Sequence[Optional[str]] = ()) -> str:
+        # unqualified names resolve against the session context, so it is part of the key
+        payload = json.dumps([sql_query, list(params or []), list(context)], default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[SpilledResult]:
+        """Return the cached result if it exists and was fetched less than `max_age` seconds ago."""
+
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if max_age is not None and time.time() - stat.st_mtime > max_age:
+            return None
+
+        # the modification time records when the result was fetched, the access time when it was last used
+        os.utime(path, (time.time(), stat.st_mtime))
+        return SpilledResult(path)
+
+    def spill(self, key: str, cs: SnowflakeCursor) -> SpilledResult:
+        """Stream the executed cursor's result batches to disk and return the memory-mapped result."""
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+
+        try:
+            writer, schema = None, None
+            for batch in cs.fetch_arrow_batches():
+                if writer is None:
+                    schema = _result_schema(batch.schema, cs.description)
+                    writer = pa_ipc.new_file(tmp_path, schema)
+                # the connector picks the narrowest integer type per result chunk (int8 ... decimal128), so chunks
+                # are cast to one schema that is wide enough for the column's declared precision
+                writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+
+            if writer is None:
+                schema = pa.schema([pa.field(column[0], pa.null()) for column in cs.description])
+                writer = pa_ipc.new_file(tmp_path, schema)
+            writer.close()
+            os.replace(tmp_path, path)
+
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.evict(keep=(path,))
+        return SpilledResult(path)
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*" + self.SUFFIX)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: Sequence[str] = ()) -> List[str]:
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                # a mapping that is still open keeps working on POSIX; on Windows the file is simply kept
+                os.remove(path)
+            except (FileNotFoundError, PermissionError):
+                continue
+            total -= size
+            evicted.append(path)
+        return evicted
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except (FileNotFoundError, PermissionError):
+                pass
+
+
+def _result_schema(schema: pa.Schema, description: Sequence) -> pa.Schema:
+    fields = []
+    for field, column in zip(schema, description):
+        is_integral = pa.types.is_integer(field.type) or (
+                pa.types.is_decimal(field.type) and field.type.scale == 0
+        )
+        if is_integral and column[1] == FIXED_TYPE_CODE and not column[5]:
+            precision = column[4] or MAX_NUMBER_PRECISION
+            target_type = pa.int64() if precision <= MAX_INT64_PRECISION else pa.decimal128(precision, 0)
+            field = field.with_type(target_type)
+        elif pa.types.is_integer(field.type):
+            field = field.with_type(pa.int64())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+if __name__ == "__main__":
+    result_cache = ResultCache()
+    for path, size, last_used in reversed(result_cache.entries()):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_used))}  {size / 1024 ** 2:>10.1f} MB  {path}")
+    print(f"Total: {result_cache.size() / 1024 ** 2:.1f} MB of {result_cache.max_bytes / 1024 ** 2:.1f} MB")
@@ -0,0 +1,92 @@
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+_KEYWORD = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
+
+
+class Keyword(str):
+    """A bare SQL keyword value such as STANDARD or XSMALL: validated and upper-cased instead of quoted."""
+
+
+class Escaped(str):
+    """A string already written in Snowflake's escape syntax, e.g. r'\\n' or r'\\134': quoted but not escaped again."""
+
+
+def ident(name: str) -> str:
+    # unquoted Snowflake identifiers resolve upper-cased, so quoting the upper-cased name keeps that meaning
+    # while making the name safe to splice into a statement
+    return '"' + name.upper().replace('"', '""') + '"'
+
+
+def qualified(*parts: Optional[str]) -> str:
+    return ".".join(ident(part) for part in parts if part)
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _cached_literal(value: Any) -> str:
+    return literal(value)
+
+
+def literal(value: Any) -> str:
+    """Render a value for a statement that cannot take bind variables (DDL, SHOW, USE).
+
+    Strings are escaped so they always read back as written: Snowflake treats a backslash as an escape character
+    inside string literals, so backslashes are doubled along with quotes. Wrap a value in `Escaped` to pass
+    Snowflake escape sequences through on purpose.
+    """
+
+    if isinstance(value, Keyword):
+        if not _KEYWORD.match(value):
+            raise ValueError(f"InvalidKeyword: {value!r}")
+        return value.upper()
+    if isinstance(value, Escaped):
+        # a quote, or a trailing backslash that would escape the closing quote, could end the literal early
+        if "'" in value or (len(value) - len(value.rstrip("\\"))) % 2:
+            raise ValueError(f"InvalidEscapedLiteral: {value!r}")
+        return "'" + value + "'"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"InvalidNumericLiteral: {value!r}")
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "(" + ", ".join(literal(item) for item in value) + ")"
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+@lru_cache(maxsize=512)
+def template(prefix: str, has_name: bool, has_body: bool, option_names: Tuple[str, ...]) -> str:
+    """Compiled statement shape, e.g. `CREATE DATABASE IF NOT EXISTS {} COMMENT = {};`, cached per shape."""
+
+    parts = [prefix]
+    if has_name:
+        parts.append("{}")
+    if has_body:
+        parts.append("{}")
+    parts.extend(f"{name} = {{}}" for name in option_names)
+    return " ".join(parts) + ";"
+
+
+def build(prefix: str, name: Optional[str] = None, options: Optional[Dict[str, Any]] = None,
+          body: Optional[str] = None) -> str:
+    """Build `<prefix> <name> <body> OPTION = value ...;` from a cached template.
+
+    `prefix` must be a constant such as "CREATE WAREHOUSE IF NOT EXISTS"; `name` is an already quoted identifier
+    (see `ident`/`qualified`); options whose value is None are left out.
+    """
+
+    option_names, args = [], [arg for arg in (name, body) if arg is not None]
+    for option, value in (options or {}).items():
+        if value is not None:
+            option_names.append(option)
+            # option values repeat across calls (TRUE, 'AUTO', ...), so their rendering is cached as well
+            try:
+                args.append(_cached_literal(value))
+            except TypeError:
+                args.append(literal(value))
+
+    sql_template = template(prefix, name is not None, body is not None, tuple(option_names))
+    return sql_template.format(*args)
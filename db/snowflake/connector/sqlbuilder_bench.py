@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import timeit
+
+current = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(current))))
+
+from db.snowflake.connector.sqlbuilder import Escaped, build, qualified, template
+
+
+def _fstring_csv_file_format(i: int) -> str:
+    # the statement as SnowflakeClient.create_csv_file_format used to assemble it
+    _ff_name = f'"SALES"."DIMENSIONS".FF_{i}'
+    return f"CREATE FILE FORMAT IF NOT EXISTS {_ff_name} TYPE = 'CSV' COMPRESSION = 'AUTO' " \
+           f"FIELD_DELIMITER = ',' RECORD_DELIMITER = '\\n' " \
+           f"SKIP_HEADER = {i % 2} " \
+           f"FIELD_OPTIONALLY_ENCLOSED_BY = 'NONE' TRIM_SPACE = {'TRUE' if i % 2 else 'FALSE'} " \
+           f"ERROR_ON_COLUMN_COUNT_MISMATCH = TRUE ESCAPE = 'NONE' " \
+           f"ESCAPE_UNENCLOSED_FIELD = '\\134' DATE_FORMAT = 'AUTO' " \
+           f"TIMESTAMP_FORMAT = 'AUTO' NULL_IF = ('\\\\N');"
+
+
+def _builder_csv_file_format(i: int) -> str:
+    return build("CREATE FILE FORMAT IF NOT EXISTS", qualified("SALES", "DIMENSIONS", f"FF_{i}"), {
+        "TYPE": "CSV",
+        "COMPRESSION": "AUTO",
+        "FIELD_DELIMITER": Escaped(","),
+        "RECORD_DELIMITER": Escaped(r"\n"),
+        "SKIP_HEADER": i % 2,
+        "FIELD_OPTIONALLY_ENCLOSED_BY": "NONE",
+        "TRIM_SPACE": bool(i % 2),
+        "ERROR_ON_COLUMN_COUNT_MISMATCH": True,
+        "ESCAPE": "NONE",
+        "ESCAPE_UNENCLOSED_FIELD": Escaped(r"\134"),
+        "DATE_FORMAT": "AUTO",
+        "TIMESTAMP_FORMAT": "AUTO",
+        "NULL_IF": (Escaped(r"\\N"),),
+    })
+
+
+def _builder_csv_file_format_cold(i: int) -> str:
+    template.cache_clear()
+    return _builder_csv_file_format(i)
+
+
+def bench_construction(number: int):
+    print(f"Statement construction, {number} statements (microseconds per statement):")
+    for label, func in (
+            ("f-string", _fstring_csv_file_format),
+            ("builder, template cached", _builder_csv_file_format),
+            ("builder, template rebuilt", _builder_csv_file_format_cold),
+    ):
+        counter = iter(range(number))
+        seconds = timeit.timeit(lambda: func(next(counter)), number=number)
+        print(f"  {label:<28}{seconds / number * 1e6:>8.2f}")
+
+
+def bench_server_compile(repeat: int):
+    from db.snowflake.connector.pyconn import SnowflakeClient
+
+    sfc = SnowflakeClient()
+    sfc.open_connection()
+    # compile time is what is being measured, so the result cache must not short-circuit the repeats
+    sfc.execute_query("ALTER SESSION SET USE_CACHED_RESULT = FALSE;")
+
+    shapes = {
+        "inlined literals": lambda i: (
+            f"SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'T_{i}' AND ROW_COUNT > {i}", None
+        ),
+        "bound parameters": lambda i: (
+            "SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = ? AND ROW_COUNT > ?", (f"T_{i}", i)
+        ),
+    }
+    print(f"Server compile time, {repeat} executions per shape (milliseconds):")
+    for label, make_statement in shapes.items():
+        query_ids = []
+        for i in range(repeat):
+            sql_query, params = make_statement(i)
+            cs = sfc.cursor
+            cs.execute(sql_query, params)
+            query_ids.append(cs.sfqid)
+            cs.close()
+
+        rows = sfc.execute_query(
+            "SELECT COMPILATION_TIME FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => 10000)) "
+            f"WHERE QUERY_ID IN ({', '.join(['?'] * len(query_ids))})",
+            query_ids,
+        )
+        compile_times = sorted(row[0] for row in rows)
+        if compile_times:
+            print(f"  {label:<28}mean {sum(compile_times) / len(compile_times):>8.1f}"
+                  f"   median {compile_times[len(compile_times) // 2]:>8.1f}")
+
+    sfc.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark of SQL statement construction and compile time.")
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--server", action="store_true", help="also measure server compile time (needs a connection)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    bench_construction(args.number)
+    if args.server:
+        bench_server_compile(args.repeat)
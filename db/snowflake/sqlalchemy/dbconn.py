@@ -7,6 +7,7 @@ from config import SnowflakeConfig
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from baseclass import Base
+from reflection import ReflectionCache
 
 
 class SnowflakeSQLAlchemyEngine:
@@ -40,6 +41,9 @@ class SnowflakeSQLAlchemyEngine:
 
         return self._conn
 
+    def reflection_cache(self, database: str = SnowflakeConfig.DATABASE, schema: str = SnowflakeConfig.SCHEMA):
+        return ReflectionCache(self.engine, database=database, schema=schema)
+
     def dispose_engine(self):
         if self._engine:
             self._engine.dispose()
@@ -66,7 +70,8 @@ finally:
 
 
 def init_db():
-    Base.metadata.create_all(engine, )
+    # existence is answered from the reflection cache; only tables it does not know are checked and created
+    ReflectionCache(engine).create_all(Base.metadata)
 
 
 def get_session():
@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import Column, MetaData, Table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import sqltypes
+
+from config.config import SnowflakeConfig
+
+
+class ReflectionCache:
+    """Table/column metadata for one database/schema, loaded in a single INFORMATION_SCHEMA pass and kept on disk.
+
+    The cache is re-used for as long as the schema watermark (table count and latest DDL time) is unchanged.
+    """
+
+    def __init__(
+            self,
+            engine: Engine,
+            database: str = SnowflakeConfig.DATABASE,
+            schema: str = SnowflakeConfig.SCHEMA,
+            cache_dir: str = SnowflakeConfig.REFLECTION_CACHE_DIR,
+            max_age: float = SnowflakeConfig.REFLECTION_CACHE_MAX_AGE,
+    ):
+        if not database:
+            raise ValueError("Please provide database name (database)")
+        if not schema:
+            raise ValueError("Please provide schema name (schema)")
+
+        self.engine = engine
+        self.database = database.upper()
+        self.schema = schema.upper()
+        self.max_age = max_age
+        self.path = os.path.join(cache_dir, f"{self.database}.{self.schema}.json")
+
+        self._tables: Optional[Dict[str, dict]] = None
+
+    @property
+    def tables(self) -> Dict[str, dict]:
+        if self._tables is None:
+            self._tables = self._load()
+        return self._tables
+
+    def has_table(self, table_name: str) -> bool:
+        # SQLAlchemy table names and the cached keys are both in the dialect's normalized form already
+        return table_name in self.tables
+
+    def invalidate(self):
+        self._tables = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def reflect(self, metadata: MetaData, only: Optional[Iterable[str]] = None) -> MetaData:
+        """Populate `metadata` with Table objects built from the cache instead of per-table catalog queries."""
+
+        names = list(only) if only else list(self.tables)
+        for name in names:
+            if name in metadata.tables:
+                continue
+            table = self.tables[name]
+            columns = [
+                Column(
+                    column["name"],
+                    self._column_type(column),
+                    nullable=column["nullable"],
+                    primary_key=column["name"] in table["primary_key"],
+                    comment=column["comment"],
+                )
+                for column in table["columns"]
+            ]
+            Table(name, metadata, *columns)
+
+        return metadata
+
+    def create_all(self, metadata: MetaData):
+        """Create the tables of `metadata` that the cache does not know about; existing tables cost no catalog query."""
+
+        missing = [table for table in metadata.sorted_tables if not self.has_table(table.name)]
+        if missing:
+            # the cache may be up to max_age old, so the rare missing tables are still checked before the DDL
+            metadata.create_all(self.engine, tables=missing, checkfirst=True)
+            self.invalidate()
+        return missing
+
+    def _column_type(self, column: dict):
+        col_type = self.engine.dialect.ischema_names.get(column["type"], sqltypes.NullType)
+        if issubclass(col_type, sqltypes.Numeric) and column["precision"] is not None:
+            return col_type(precision=column["precision"], scale=column["scale"])
+        if issubclass(col_type, sqltypes.String) and column["length"] is not None:
+            return col_type(length=column["length"])
+        return col_type()
+
+    def _load(self) -> Dict[str, dict]:
+        cached = None
+        if os.path.exists(self.path):
+            with open(self.path, "r") as cache_file:
+                cached = json.load(cache_file)
+
+            if time.time() - cached["fetched_at"] < self.max_age:
+                return cached["tables"]
+
+        with self.engine.connect() as conn:
+            watermark = self._watermark(conn)
+            if cached and cached["watermark"] == watermark:
+                cached["fetched_at"] = time.time()
+                self._save(cached)
+                return cached["tables"]
+
+            tables = self._fetch(conn)
+
+        self._save({"watermark": watermark, "fetched_at": time.time(), "tables": tables})
+        return tables
+
+    def _save(self, content: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(content, cache_file, default=str)
+        os.replace(tmp_path, self.path)
+
+    def _watermark(self, conn) -> str:
+        sql_query = text(
+            f'SELECT COUNT(*), MAX(LAST_DDL) FROM "{self.database}".INFORMATION_SCHEMA.TABLES '
+            "WHERE TABLE_SCHEMA = :schema"
+        )
+        count, last_ddl = conn.execute(sql_query, {"schema": self.schema}).fetchone()
+        return f"{count}:{last_ddl}"
+
+    def _fetch(self, conn) -> Dict[str, dict]:
+        normalize_name = self.engine.dialect.normalize_name
+        tables: Dict[str, dict] = {}
+
+        sql_query = text(
+            "SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, CHARACTER_MAXIMUM_LENGTH, "
+            "NUMERIC_PRECISION, NUMERIC_SCALE, COMMENT "
+            f'FROM "{self.database}".INFORMATION_SCHEMA.COLUMNS '
+            "WHERE TABLE_SCHEMA = :schema ORDER BY TABLE_NAME, ORDINAL_POSITION"
+        )
+        for row in conn.execute(sql_query, {"schema": self.schema}):
+            table = tables.setdefault(normalize_name(row[0]), {"columns": [], "primary_key": []})
+            table["columns"].append(
+                {
+                    "name": normalize_name(row[1]),
+                    "type": row[2],
+                    "nullable": row[3] == "YES",
+                    "length": row[4],
+                    "precision": row[5],
+                    "scale": row[6],
+                    "comment": row[7],
+                }
+            )
+
+        # SHOW returns the primary keys of every table in the schema at once (table_name, column_name are fields 4/5)
+        for row in conn.execute(text(f'SHOW PRIMARY KEYS IN SCHEMA "{self.database}"."{self.schema}"')):
+            table = tables.get(normalize_name(row[3]))
+            if table is not None:
+                table["primary_key"].append(normalize_name(row[4]))
+
+        return tables
@@ -0,0 +1,99 @@
+from typing import Iterator, Optional, Tuple, Type
+
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import Session
+
+from baseclass import Base
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def _primary_key(model: Type[Base]) -> Tuple:
+    return tuple(inspect(model).primary_key)
+
+
+def _key_filter(pk_columns: Tuple, last_key: Tuple):
+    if len(pk_columns) == 1:
+        return pk_columns[0] > last_key[0]
+    return tuple_(*pk_columns) > tuple_(*last_key)
+
+
+def stream_models(session: Session, model: Type[Base], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Base]:
+    """Stream ORM objects from a server-side cursor, building at most one batch of objects at a time.
+
+    The session's identity map only holds weak references to unmodified objects, so objects the caller has
+    let go of are freed without detaching anything else from the session.
+    """
+
+    query = session.query(model).execution_options(stream_results=True).yield_per(batch_size)
+    yield from query
+
+
+def iter_models_by_key(
+        session: Session, model: Type[Base], batch_size: int = DEFAULT_BATCH_SIZE, filters: Optional[list] = None
+) -> Iterator[Base]:
+    """Walk a table in primary key order, one LIMIT page at a time, resuming after the last key seen."""
+
+    pk_columns = _primary_key(model)
+    last_key: Optional[Tuple] = None
+    while True:
+        query = session.query(model)
+        if filters:
+            query = query.filter(*filters)
+        if last_key is not None:
+            query = query.filter(_key_filter(pk_columns, last_key))
+
+        page = query.order_by(*pk_columns).limit(batch_size).all()
+        if not page:
+            return
+
+        last_key = inspect(page[-1]).identity
+        yield from page
+
+        if len(page) < batch_size:
+            return
+
+
+def iter_columns(
+        session: Session, model: Type[Base], *columns, batch_size: int = DEFAULT_BATCH_SIZE,
+        filters: Optional[list] = None
+) -> Iterator[Tuple]:
+    """Walk a table in primary key order, yielding plain row tuples of the requested columns.
+
+    Rows are not turned into ORM objects, so there is no identity map or attribute instrumentation overhead.
+    The primary key columns are always fetched to drive the pagination and are returned after the requested ones.
+    """
+
+    pk_columns = _primary_key(model)
+    columns = columns or tuple(inspect(model).columns)
+    key_start = len(columns)
+    last_key: Optional[Tuple] = None
+    while True:
+        query = session.query(*columns, *pk_columns)
+        if filters:
+            query = query.filter(*filters)
+        if last_key is not None:
+            query = query.filter(_key_filter(pk_columns, last_key))
+
+        page = query.order_by(*pk_columns).limit(batch_size).all()
+        if not page:
+            return
+
+        last_key = tuple(page[-1][key_start:])
+        for row in page:
+            yield tuple(row)
+
+        if len(page) < batch_size:
+            return
+
+
+if __name__ == "__main__":
+    from dbconn import get_session
+    from models.region import Region
+
+    session = get_session()()
+    try:
+        for region_name, region_id in iter_columns(session, Region, Region.name, batch_size=500):
+            print(region_id, region_name)
+    finally:
+        session.close()
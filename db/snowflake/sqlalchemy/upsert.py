@@ -0,0 +1,65 @@
+from typing import Iterable, Optional, Sequence, Type, Union
+
+from sqlalchemy import inspect
+
+from baseclass import Base
+from db.snowflake.connector.pyconn import SnowflakeClient
+
+
+def _column_name(column) -> str:
+    # accepts a column name, a Column or a mapped attribute such as Region.name
+    if isinstance(column, str):
+        return column
+    if hasattr(column, "property"):
+        return column.property.columns[0].name
+    return column.name
+
+
+def upsert_models(
+        sfc: SnowflakeClient,
+        model: Type[Base],
+        rows: Iterable[Union[dict, Base]],
+        key: Optional[Sequence] = None,
+        columns: Optional[Sequence] = None,
+        use_put: bool = False,
+) -> dict:
+    """Bulk upsert rows into a model's table with a single MERGE on its primary key or on the given `key` columns
+    (e.g. `key=[Region.name]`). Rows are dicts keyed by attribute name or model instances.
+
+    With a `key` other than the primary key, the primary key columns are only written for new rows."""
+
+    mapper = inspect(model)
+    attrs = {attr.columns[0].name: attr.key for attr in mapper.column_attrs}
+    if columns:
+        column_names = [_column_name(column) for column in columns]
+    else:
+        column_names = [column.name for column in mapper.local_table.columns]
+    pk_names = [column.name for column in mapper.primary_key]
+    key_names = [_column_name(column) for column in key] if key else pk_names
+    # matching on another unique key must not rewrite the primary key of an existing row
+    _key_names = {name.upper() for name in key_names}
+    insert_only_names = [name for name in pk_names if name.upper() not in _key_names]
+
+    def to_tuple(row):
+        if isinstance(row, dict):
+            return tuple(row.get(attrs[name]) for name in column_names)
+        return tuple(getattr(row, attrs[name]) for name in column_names)
+
+    return sfc.upsert_rows(
+        model.__tablename__, column_names, (to_tuple(row) for row in rows), key_names, use_put=use_put,
+        schema_name=model.__table__.schema,
+        insert_only_columns=insert_only_names,
+    )
+
+
+if __name__ == "__main__":
+    from models.region import Region
+
+    sfc = SnowflakeClient()
+    sfc.open_connection()
+    regions = [
+        {"id": 1, "name": "Canada", "two_letter_abbr": "CA", "three_letter_abbr": "CAN", "currency_code": "CAD"},
+        {"id": 2, "name": "Vietnam", "two_letter_abbr": "VN", "three_letter_abbr": "VNM", "currency_code": "VND"},
+    ]
+    print(upsert_models(sfc, Region, regions, key=[Region.name]))
+    sfc.close_connection()
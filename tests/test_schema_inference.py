@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("snowflake.connector")
+
+from db.snowflake.connector.schema_inference import infer_csv_schema  # noqa: E402
+
+
+def _write_csv(tmp_path, text: str) -> str:
+    csv_filepath = tmp_path / "data.csv"
+    csv_filepath.write_text(text)
+    return str(csv_filepath)
+
+
+def test_infers_types(tmp_path):
+    csv_filepath = _write_csv(
+        tmp_path,
+        "id,price,flag,day,ts,note\n"
+        "1,-12.50,true,2021-01-02,2021-01-02 03:04:05,a\n"
+        "22,0.125,No,2021-12-31,2021-12-31T23:59:59,\n",
+    )
+    assert infer_csv_schema(csv_filepath).column_types == [
+        ("id", "NUMBER(2, 0)", False),
+        ("price", "NUMBER(5, 3)", False),
+        ("flag", "BOOLEAN", False),
+        ("day", "DATE", False),
+        ("ts", "TIMESTAMP_NTZ", False),
+        ("note", "VARCHAR(1)", True),
+    ]
+
+
+def test_numeric_block_rules_out_dates_in_later_blocks(tmp_path):
+    csv_filepath = _write_csv(tmp_path, "v\n" + "1.5\n" * 262143 + "2021-01-01\n" * 1000)
+    assert infer_csv_schema(csv_filepath, memory_budget=1).column_types == [("v", "VARCHAR(10)", False)]
+
+
+def test_long_cell_does_not_widen_other_cells(tmp_path):
+    csv_filepath = _write_csv(tmp_path, "a,b\n" + "x" * 200000 + ",1\n" + "y,2\n" * 100000)
+    assert infer_csv_schema(csv_filepath).column_types == [("a", "VARCHAR(200000)", False), ("b", "NUMBER(1, 0)", False)]
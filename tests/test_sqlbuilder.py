@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from db.snowflake.connector.sqlbuilder import Escaped, Keyword, build, ident, literal
+
+
+def test_literal_doubles_quotes():
+    assert literal("it's") == "'it''s'"
+
+
+def test_literal_escapes_backslashes():
+    assert literal("C:\\temp\\") == "'C:\\\\temp\\\\'"
+
+
+def test_literal_backslash_cannot_end_the_string_early():
+    sql_query = build("CREATE DATABASE IF NOT EXISTS", ident("d"), {"COMMENT": "x\\'; DROP DATABASE PROD; --"})
+    assert sql_query == "CREATE DATABASE IF NOT EXISTS \"D\" COMMENT = 'x\\\\''; DROP DATABASE PROD; --';"
+
+
+def test_escaped_passes_snowflake_escapes_through():
+    assert literal(Escaped(r"\n")) == r"'\n'"
+    assert literal(Escaped(r"\\N")) == r"'\\N'"
+    assert literal((Escaped(r"\134"),)) == r"('\134')"
+
+
+@pytest.mark.parametrize("value", ["a'b", "a\\", "a\\\\\\"])
+def test_escaped_rejects_values_that_end_the_string_early(value):
+    with pytest.raises(ValueError):
+        literal(Escaped(value))
+
+
+def test_escaped_and_plain_values_are_cached_separately():
+    assert build("X", options={"A": "\\n"}) == "X A = '\\\\n';"
+    assert build("X", options={"A": Escaped("\\n")}) == "X A = '\\n';"
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_literal_rejects_non_finite_floats(value):
+    with pytest.raises(ValueError):
+        literal(value)
+
+
+def test_literal_keyword_is_validated():
+    assert literal(Keyword("xsmall")) == "XSMALL"
+    with pytest.raises(ValueError):
+        literal(Keyword("XSMALL; DROP"))